@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import os
+import sys
+
+sys.path.append('fashionsite')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fashionsite.settings')
+
+import django
+django.setup()
+
+from fashionistapulp.fashionista_config import set_config_value
+from fashionistapulp.model import Model
+from fashionistapulp.solver_benchmark import (benchmark_backends, compare_big_m_node_counts,
+                                              get_benchmark_inputs)
+
+def main():
+    model = Model()
+    model_inputs = get_benchmark_inputs()
+    timings = benchmark_backends(model, model_inputs)
+    for name, seconds in sorted(timings.items(), key=lambda timing: timing[1]):
+        print('%-12s %.2fs' % (name, seconds))
+    if not timings:
+        print('No solver backend completed the benchmark, keeping the current choice.')
+        return
+    fastest = min(timings, key=timings.get)
+    set_config_value('solver_backend_benchmarked', fastest)
+    print('Using %s when solver_backend is auto.' % fastest)
+    
+    for level, nodes_before, nodes_after in compare_big_m_node_counts(model, model_inputs, fastest):
+        print('Level %d: %s nodes with the built big-Ms, %s tightened' % (level, nodes_before, nodes_after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from queue import Queue
+import subprocess
+import time
+from threading import Condition, Lock, Thread
+
+from .solve_handle import SOLVER_PREEXEC_FN
+from .solver_admission import HostSlots, fcntl
+
+IDLE_TIMEOUT = 300
+SLOT_POLL_INTERVAL = 0.1
+
+
+class CbcWorkerError(Exception):
+    pass
+
+
+class CbcWorker:
+    """
+    A CBC process started ahead of time and left waiting on its stdin, so
+    that the exec and library loading are already done when a problem comes
+    in. CBC keeps the previous incumbent and settings around between two
+    imports in interactive mode, so a worker only ever solves one problem.
+    """
+
+    def __init__(self, path, slot=None):
+        self.process = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True,
+                                        preexec_fn=SOLVER_PREEXEC_FN)
+        self.slot = slot
+        self.last_used = time.time()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def run_commands(self, commands, handle):
+        try:
+            output, _ = handle.communicate(self.process, '\n'.join(commands + ['quit']) + '\n')
+        except OSError as e:
+            self.close()
+            raise CbcWorkerError('Could not send commands to CBC: %s' % e)
+        if self.process.returncode != 0:
+            raise CbcWorkerError('CBC worker exited with code %s' % self.process.returncode)
+        return output
+
+    def close(self):
+        if self.is_alive():
+            self.process.kill()
+            self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            if not pipe.closed:
+                pipe.close()
+
+
+class CbcWorkerPool:
+
+    def __init__(self, path, max_workers, host_slots=None):
+        self.path = path
+        self.max_workers = max_workers
+        self.host_slots = host_slots
+        self.condition = Condition(Lock())
+        self.idle_workers = []
+        self.workers_created = 0
+        # Slots of the used workers whose replacement is still to start.
+        self.replacement_slots = Queue()
+
+        reaper = Thread(target=self._reap_forever, name='cbc-worker-reaper', daemon=True)
+        reaper.start()
+        # Replacements are started from this thread, which lives as long as
+        # the process. A worker is killed with the thread that started it,
+        # so one started on a request thread dies when that thread ends.
+        starter = Thread(target=self._start_replacements_forever, name='cbc-worker-starter',
+                         daemon=True)
+        starter.start()
+
+    def borrow(self, timeout, handle=None):
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                if handle is not None:
+                    handle.check()
+                if self.idle_workers:
+                    worker = self.idle_workers.pop()
+                    if worker.is_alive():
+                        return worker
+                    # Died while idle: start a new process in its slot.
+                    worker.close()
+                    slot = worker.slot
+                    break
+                if self.workers_created < self.max_workers:
+                    slot = None if self.host_slots is None else self.host_slots.try_acquire()
+                    if self.host_slots is None or slot is not None:
+                        self.workers_created += 1
+                        break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise CbcWorkerError('No CBC worker became available in %d seconds' % timeout)
+                self.condition.wait(min(remaining, SLOT_POLL_INTERVAL))
+
+        return self._start_worker(slot)
+
+    def give_back(self, worker):
+        """
+        Replaces a used worker by a fresh one holding the same slot, which
+        warms up while nobody is waiting on it.
+        """
+        worker.close()
+        self.replacement_slots.put(worker.slot)
+
+    def _start_replacements_forever(self):
+        while True:
+            slot = self.replacement_slots.get()
+            try:
+                new_worker = CbcWorker(self.path, slot)
+            except OSError:
+                self._forget(slot)
+                continue
+            with self.condition:
+                self.idle_workers.append(new_worker)
+                self.condition.notify()
+
+    def discard(self, worker):
+        worker.close()
+        self._forget(worker.slot)
+
+    def _start_worker(self, slot):
+        try:
+            return CbcWorker(self.path, slot)
+        except OSError as e:
+            self._forget(slot)
+            raise CbcWorkerError('Could not start CBC worker: %s' % e)
+
+    def _forget(self, slot):
+        if slot is not None:
+            self.host_slots.release(slot)
+        with self.condition:
+            self.workers_created -= 1
+            self.condition.notify()
+
+    def reap_idle_workers(self):
+        now = time.time()
+        with self.condition:
+            expired = [w for w in self.idle_workers if now - w.last_used > IDLE_TIMEOUT]
+            self.idle_workers = [w for w in self.idle_workers if w not in expired]
+        for worker in expired:
+            self.discard(worker)
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(IDLE_TIMEOUT / 4)
+            self.reap_idle_workers()
+
+
+pool_lock = Lock()
+worker_pool = None
+
+def get_worker_pool(path, max_workers, max_host_workers, slots_directory):
+    global worker_pool
+    if worker_pool is None:
+        with pool_lock:
+            if worker_pool is None:
+                host_slots = None
+                if fcntl is not None and max_host_workers > 0:
+                    host_slots = HostSlots(slots_directory, max_host_workers)
+                worker_pool = CbcWorkerPool(path, max_workers, host_slots)
+    return worker_pool
@@ -17,6 +17,7 @@
 import os
 import platform
 import sys
+import tempfile
 
 path = None
 
@@ -53,9 +54,63 @@ def get_fashionista_path():
     
     return path
 
+def get_config_file_path(name):
+    system_type = platform.system()
+    if system_type == 'Windows':
+        return os.path.join(os.environ['APPDATA'], 'fashionista', name)
+    else:  # Linux, macOS, etc.
+        return os.path.join('/etc/fashionista', name)
+
+def get_config_value(name, default=None):
+    try:
+        with open(get_config_file_path(name)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return default
+
+def set_config_value(name, value):
+    with open(get_config_file_path(name), 'w') as f:
+        f.write('%s\n' % value)
+
+solver_backend = None
+
+def get_solver_backend_name():
+    # 'auto' uses the winner of the last benchmark_solvers.py run.
+    global solver_backend
+    if solver_backend is None:
+        solver_backend = get_config_value('solver_backend', 'auto')
+        if solver_backend == 'auto':
+            solver_backend = get_config_value('solver_backend_benchmarked', 'cbc_template')
+    return solver_backend
+
+def get_cbc_worker_limits():
+    workers_per_process = int(get_config_value('cbc_workers', 1))
+    workers_per_host = int(get_config_value('cbc_host_workers', os.cpu_count() or 1))
+    return workers_per_process, workers_per_host
+
+def get_solver_core_budget():
+    # Cores all the solvers of the machine may use at once.
+    return int(get_config_value('solver_core_budget', os.cpu_count() or 1))
+
+def get_solver_threads():
+    return int(get_config_value('solver_threads', 1))
+
+def get_solver_tmp_dir():
+    # Prefer a memory backed directory for the solver and lock files.
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+def get_request_deadline():
+    # Seconds a /fashion/ request may spend solving, below gunicorn's timeout.
+    return float(get_config_value('request_deadline', 110))
+
 def get_items_db_path():
     return os.path.join(get_fashionista_path(), 'fashionistapulp', 'fashionistapulp', 'items.db')
 
+def get_model_artifact_dir():
+    return get_config_value('model_artifact_dir', os.path.join(get_fashionista_path(), 'compiled_models'))
+
 def get_items_dump_path():
     return os.path.join(get_fashionista_path(), 'fashionistapulp', 'fashionistapulp', 'item_db_dumped.dump')
 
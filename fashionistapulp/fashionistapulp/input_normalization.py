@@ -0,0 +1,135 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from .item_valuations import LEVEL, resolve_special_item_values, scale_with_objective
+from .model import ModelInput, NO_MINIMUM_STAT, get_forbidding_options, get_option_item_positions
+from .structure import get_structure
+
+from functools import reduce
+import math
+
+# Settings of each forbidding option, an option is set to the first one that
+# rules out the same items at the character's level.
+OPTION_SETTINGS = {'dofus': [True, False, 'lightset', 'cawwot'],
+                   'dragoturkey': [True, False],
+                   'seemyool': [True, False],
+                   'rhineetle': [True, False],
+                   'prysmaradite': [False, True]}
+
+# Structure the option items were found for, and those items.
+option_items_cache = None
+
+def get_option_items(structure):
+    global option_items_cache
+    if option_items_cache is None or option_items_cache[0] is not structure:
+        items = structure.get_available_items_list()
+        option_items = {option: [items[i] for i in positions] for option, positions
+                        in get_option_item_positions(structure, items).items()}
+        option_items_cache = (structure, option_items)
+    return option_items_cache[1]
+
+def get_ruled_out_ids(option_items, options, level):
+    ruled_out = set()
+    for option in get_forbidding_options(options):
+        ruled_out.update(item.id for item in option_items[option] if item.level <= level)
+    return ruled_out
+
+def normalize_model_input(model_input):
+    """
+    Input with the same best build as model_input, written the same way as
+    the other inputs that only differ from it by entries with no effect or
+    by the scale of the objective values. The solution memory, the model
+    pool and Model.setup() all get it, so those inputs share their work.
+    """
+    structure = get_structure()
+    level = model_input.char_level
+    option_items = get_option_items(structure)
+    options = normalize_options(option_items, model_input.options, level)
+    forbidden_equips = normalize_forbidden_equips(structure, model_input.forbidden_equips, level)
+    usable_ids = get_usable_ids(structure, option_items, level, forbidden_equips, options)
+    objective_values = normalize_objective_values(structure, model_input.objective_values, usable_ids)
+    return ModelInput(level,
+                      model_input.base_stats_by_attr,
+                      normalize_minimum_stats(model_input.minimum_stats),
+                      model_input.locked_equips,
+                      forbidden_equips,
+                      objective_values,
+                      options,
+                      model_input.char_class,
+                      model_input.stat_points_to_distribute)
+
+def normalize_minimum_stats(minimum_stats):
+    # A minimum of NO_MINIMUM_STAT is the same as none.
+    normalized = {stat: value for stat, value in minimum_stats.items()
+                  if stat != 'adv_mins' and value != NO_MINIMUM_STAT}
+    adv_mins = {stat: value for stat, value in (minimum_stats.get('adv_mins') or {}).items()
+                if value != NO_MINIMUM_STAT}
+    if adv_mins:
+        normalized['adv_mins'] = adv_mins
+    return normalized
+
+def normalize_options(option_items, options, level):
+    # Options about items above the character's level don't matter.
+    normalized = dict(options)
+    for option, settings in OPTION_SETTINGS.items():
+        ruled_out = get_ruled_out_ids(option_items, normalized, level)
+        for setting in settings:
+            if get_ruled_out_ids(option_items, dict(normalized, **{option: setting}), level) == ruled_out:
+                normalized[option] = setting
+                break
+    return normalized
+
+def normalize_forbidden_equips(structure, forbidden_equips, level):
+    # Items above the character's level are out anyway, unless forbidding
+    # them also forbids the other variants of their OR item.
+    or_item_ids = set(item.id for or_item_items in structure.get_available_or_items().values()
+                      for item in or_item_items)
+    normalized = set()
+    for item_id in forbidden_equips:
+        item = structure.get_item_by_id(item_id)
+        if item is not None and not item.removed and (item.level <= level or item_id in or_item_ids):
+            normalized.add(item_id)
+    return normalized
+
+def get_usable_ids(structure, option_items, level, forbidden_equips, options):
+    """
+    Ids of the special items the input lets into the build.
+    """
+    ruled_out = get_ruled_out_ids(option_items, options, level)
+    usable_ids = set()
+    for item_id, _ in resolve_special_item_values(structure):
+        item = structure.get_item_by_id(item_id)
+        if item.level <= level and item_id not in forbidden_equips and item_id not in ruled_out:
+            usable_ids.add(item_id)
+    return usable_ids
+
+def normalize_objective_values(structure, objective_values, usable_ids):
+    special_item_values = resolve_special_item_values(structure)
+    factors = set(factor for _, terms in special_item_values for term in terms for factor in term[1:]
+                  if factor != LEVEL)
+    # Zero weights and keys that are neither stats nor special item factors
+    # add nothing to the objective.
+    normalized = {stat: value for stat, value in objective_values.items()
+                  if value != 0 and (structure.get_stat_by_key(stat) is not None or stat in factors)}
+    # Integer weights are divided by their greatest common divisor when that
+    # scales the whole objective, which constant and product terms of the
+    # usable special items don't follow.
+    if (all(type(value) == int for value in normalized.values())
+        and scale_with_objective(special_item_values, normalized, usable_ids)):
+        divisor = reduce(math.gcd, (abs(value) for value in normalized.values()), 0)
+        if divisor > 1:
+            normalized = {stat: value // divisor for stat, value in normalized.items()}
+    return normalized
@@ -0,0 +1,296 @@
+# Copyright (C) 2020 The Dofus Fashionista
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Factor of a term that stands for the character level.
+LEVEL = 'level'
+
+# Objective weight given to wearing items whose effects aren't stats. Each
+# term is a coefficient followed by the factors it is multiplied by: the
+# weights of the objective (0 when missing) and LEVEL.
+SPECIAL_ITEM_VALUES = [
+    #Deep Crimson: When attacked, the bearer gains 1% final damage for 2 turns (stackable 10 times).
+    ('Crimson Dofus', [(7, 'permedam'), (7, 'perrandam')]),
+
+    #Equivalent to 0.5 * level HP
+    #At the end of the turn, gives 100% of the owner's level in shield points for each adjacent enemy.\nSummons are not counted.
+    ('Emerald Dofus', [(0.5, 'hp', LEVEL)]),
+
+    #Equivalent to 5 CH
+    #For each Critical Hit inflicted, the final damage is increased by 1% for 3 turns. Can be stacked 10 times.
+    ('Turquoise Dofus', [(5, 'ch')]),
+
+    #75 per stat on average
+    #Increases one elemental characteristic per game turn: 300 to Chance, then 300 to Strength, then 300 to Agility, and then 300 to Intelligence.
+    ('Dofusteuse', [(75, 'agi'), (75, 'cha'), (75, 'int'), (75, 'str')]),
+
+    #Equivalent to 12.5 MP Loss Res + 12.5 AP Loss Res
+    #Gives 25 AP Parry if an AP penalty is suffered, or 25 MP Parry if an MP penalty is suffered. \nThe two effects last 1 turn and do not stack.
+    ('Cawwot Dofus', [(12.5, 'apres'), (12.5, 'mpres')]),
+
+    #Equivalent to 5% damage + 10 lock
+    #Increases damage inflicted by 10% for 1 turn if the bearer has suffered no damage from enemies since the last turn.\nOtherwise, gives 20 Lock.
+    ('Vulbis Dofus', [(5, 'permedam'), (5, 'perrandam'), (10, 'lock')]),
+
+    #If the bearer inflicts damage during their turn, they and their allies carrying the Dorigami gain 20 damage for 1 turn.\n\nIf the bearer does not inflict damage, they and their allies carrying the Domakuro gain 150% of their respective levels in shield for 1 turn.
+    ('Black-Spotted Dofus', [(10, 'dam'), (150 / 200 / 2, 'hp', LEVEL)]),
+
+    #Ebony Black: When the bearer attacks in close combat during their turn, they gain 1% ranged damage for 3 turns (stackable 10 times).\nWhen they attack from long range, they gain 1% close-combat damage for 3 turns (stackable 10 times).\nTriggering both effects during the turn allows the next attack to apply a 16 poison in its element for 2 turns (stackable 2 times, once every 2 turns).
+    ('Ebony Dofus', [(5, 'permedam'), (5, 'perrandam'), (16 / 200, 'pow', LEVEL)]),
+
+    #Equivalent to 10% res distance and melee
+    #The bearer reduces damage from one out of five attacks by 50%. The reduction is lost if this one is sacrificed.
+    ('Ivory Dofus', [(10, 'respermee'), (10, 'resperran')]),
+
+    #Equivalent to 0.2 AP + 16 Dodge
+    #Gives 1 AP for 1 turn if the bearer has suffered no damage from enemies since the last turn.\nOtherwise, gives 20 Dodge.
+    ('Ochre Dofus', [(0.2, 'ap'), (16, 'dodge')]),
+
+    #On odd turns, the bearer gains 20% final damage but loses 10% final healing.\nOn even turns, the bearer gains 20% final healing but loses 10% final damage.
+    ('Cloudy Dofus', [(5, 'permedam'), (5, 'perrandam'), (5, 'heals')]),
+
+    #TODO: find better way to add weight to Watchers Dofus
+    #Equivalent to 10 heals
+    #At the end of the turn, returns 7% HP to aligned allies.
+    ('Watchers Dofus', [(10 / 200.0, 'heals', LEVEL), (2500 / 200.0, LEVEL)]),
+
+    #Every 3 turns starting on turn 3, returns 10% of their maximum health points.
+    ('Dokoko', [(4500.0 * 10 / 100 * (1/3) / 200, 'hp', LEVEL)]),
+
+    #At the start of each turn, if there are no enemies in close combat, gives 1 MP. Otherwise, gives 1 AP.
+    ('Abyssal Dofus', [(2.5, 'ap'), (2.5, 'mp')]),
+
+    #Applies 100% of level as shield points to its bearer, 1 time max per turn for pushback damage and 1 time for each type of movement: \n- pushback damage\n- pushback / attraction\n- place switching / teleportation / Eliotrope portal\n- carried by a Pandawa\n\nThe effect can only be triggered by enemies.
+    ('Lavasmith Dofus', [(100 / 200, 'hp', LEVEL)]),
+
+    #As soon as the bearer falls below 20% of their health points, the Dofus's effect is triggered.\nAt the start of their next turn: heals 20% HP (once per fight).
+    #Formula: expected life at lvl 200: 4500 - get 20% of that.
+    #Multiply by 0.2, since you wont get the bonus too often
+    #Correct for level
+    ('Silver Dofus', [(4500.0 * 20 / 100 * 0.2 / 200, 'hp', LEVEL)]),
+
+    #As soon as the bearer falls below 20% of their health points, the Dofus's effect is triggered.\nAt the start of their next turn: heals 30% HP and gives 20% final damage for 1 turn (once per fight).
+    #Formula: expected life at lvl 200: 4500 - get 40% of that.
+    # Add 30% power to simulate final damage
+    # Multiply by 0.2, since you wont get the bonus too often
+    # Correct for level
+    ('Sparkling Silver Dofus', [(4500.0 * 30 / 100 * 0.2 / 200, 'hp', LEVEL),
+                                (20 * 0.2, 'respermee'), (20 * 0.2, 'resperran')]),
+
+    #TODO: find better way to add weight to Crocobur
+    #Equivalent to 200 HP * meleeness
+    #At the start of each turn, the bearer inflicts damage on themself in their best attack element to steal health from adjacent entities at the end of the caster's turn.
+    ('Crocobur 3', [(1 / 2, 'hp', LEVEL), (1 / 200, 'perrandam', LEVEL)]),
+
+    #When the bearer lands a critical hit, they gain 10 Pushback Damage for 3 turns (stackable 10 times).
+    #With crits, you can stack up to 100 Pushback Damage (10 stacks × 10)
+    #For crit builds (~60% crit): sustain ~6 stacks on average = 60 pushback damage
+    #More conservative: ~40-50 average pushback damage for crit builds
+    ('Buhorado Feather', [(45 / 100, 'pshdam', 'ch')]),
+
+    #Equivalent to 2% HP
+    #If the bearer ends their turn with a line of sight to at least one opponent, they earn a 10% damage suffered reduction for 1 turn as long as they haven't been pushed, attracted, carried, teleported or transposed.
+    ("Fallanster's Rectitude", [(8, 'respermee'), (8, 'resperran')]),
+
+    #Equivalent to 2.5% res distance and melee
+    #Damage suffered by the bearer is increased by 15% whenever they have more than 50% HP, but damage suffered is reduced by 20% whenever they have less than 50% HP.
+    ("Death-Defying", [(2.5, 'respermee'), (2.5, 'resperran')]),
+
+    #Equivalent to 7.5% weapon damage
+    #When the bearer suffers an AP, MP or Range removal, they gain 3% weapon damage for 2 turns, stackable 5 times.
+    ("Bram Worldbeard's Crown", [(7.5, 'perweadam')]),
+
+    #Equivalent to 1 AP
+    #The bearer gains 2 AP on even turns and loses 1 AP on odd turns.
+    ("Ganymede's Diadem", [(1, 'ap')]),
+
+    #Equivalent to 400 hp and -10% ranged damage
+    #For each distance attack suffered, the bearer gains shield and loses ranged damage for 1 turn; stackable up to 5 times maximum. The damage penalty and shield values vary according to the distance between the bearer and their attacker.
+    #Will consider 3 distance attacks each turn
+    ("Rykke Errel's Bravery", [(200 * 3, 'hp'), (-5 * 3, 'perrandam')]),
+
+    #Equivalent to 1.5% resists (1-2 hits on each element)
+    #When the bearer suffers damage in an element, they gain 3% resistance in that element for 2 turns, stackable 5 times.
+    ("Jahash Jurgen's Nobility", [(1.5, 'neutresper'), (1.5, 'airresper'), (1.5, 'earthresper'),
+                                  (1.5, 'fireresper'), (1.5, 'waterresper')]),
+
+    #Equivalent to 1 MP
+    #The bearer gains 2 MP on odd turns and loses 1 MP on even turns.
+    ('Thousand-League Boots', [(1, 'mp')]),
+
+    #Equivalent to 30 Dodge and 50 Pushback Damage
+    #At the start of each turn, the bearer pushes entities in close combat back 2 cells.
+    ("Kicked Ass Boots", [(30, 'dodge'), (50, 'pshdam')]),
+
+    #Equivalent to 50 dodge, 5% critical hits and 40 pushback damage
+    #At the start of each turn, the caster randomly teleports to an adjacent cell. If the move is impossible, they earn a +10% chance of critical hits and +80 Pushback Damage for 1 turn.
+    ("Dodge's Audacity", [(50, 'dodge'), (5, 'ch'), (40, 'pshdam')]),
+
+    #Equivalent to 25 Lock
+    #At end of their turn, the bearer removes 100 Dodge from adjacent enemies for 1 turn.
+    ("Lady Jhessica's Courage", [(50, 'lock')]),
+
+    #Each ranged attack suffered while you are in close combat with an enemy grants a chocolate mark.\n\nThese marks are consumed at the end of your turn; each one gives 25% of your level in shield for 1 turn.
+    ("Cocoa Dofus 2", [(50 / 200, 'hp', LEVEL)]),
+
+    #The bearer gains 550% of their level in shield points on the first turn, 200% on the second turn and 100% on the third.
+    ("Prytekt-O-Mat", [((0.7*550 + 0.85*200 + 100) / 4 / 200, 'hp', LEVEL)]),
+
+    #The bearer gains 150% of their level in shield points on the first turn, 450% on the second turn and 150% on the third.
+    ("Shiny Prytekt", [((0.7*150 + 0.85*450 + 150) / 4 / 200, 'hp', LEVEL)]),
+
+    #The bearer gains 100% of their level in shield points on the first turn, 200% on the second turn and 350% on the third.
+    ("Iridescent Prytekt", [((0.7*100 + 0.85*200 + 350) / 4 / 200, 'hp', LEVEL)]),
+
+    #The bearer gains 1 AP for 3 turns but inflicts -10% damage.
+    ("Pryssure-O-Mat", [(0.75, 'ap'), (-7.5, 'permedam'), (-7.5, 'perrandam')]),
+
+    #The bearer gains 2 AP for 2 turns but inflicts -35% damage.
+    ("Shiny Pryssure", [(1, 'ap'), (-17.5, 'permedam'), (-17.5, 'perrandam')]),
+
+    #The bearer gains 4 AP for 1 turn but inflicts -50% damage.
+    ("Iridescent Pryssure", [(1, 'ap'), (-12.5, 'permedam'), (-12.5, 'perrandam')]),
+
+    #The bearer gains 100% Critical on the first turn, 35% on the second turn and 15% on the third turn.
+    #For crit builds with ~60% base crit: Turn 1: +40% (capped at 100%), Turn 2: +35%, Turn 3: +15%
+    #Average effective bonus: (40 + 35 + 15) / 3 = 30% average for crit builds
+    ("Surpryz", [(20, 'ch')]),
+
+    #The bearer sacrifices 10% resistance to gain 10% final damage on the first turn, then gains 3% final damage and resistance on the second turn, and sacrifices 10% final damage to gain 10% resistance on the third turn.
+    #Turn 1: +10% damage, -10% res | Turn 2: +3% damage, +3% res | Turn 3: -10% damage, +10% res
+    #With optimal play: attack on turns 1-2 (13% damage total), defend on turn 3 (10% res when needed)
+    #Effective value: ~4-5% damage when attacking, ~3% res when defending
+    ("Prynyang", [(5, 'permedam'), (5, 'perrandam'), (4, 'respermee'), (4, 'resperran')]),
+
+    #The bearer gains 1 MP (2 turns) per enemy more than 15 cells away.
+    ("Prycapture", [(0.5, 'mp')]),
+
+    #Heals 15% of enemy damage suffered until the end of the third turn.
+    ("Prygenerate", [(0.15 * 3, 'hp', LEVEL)]),
+
+    #The bearer gains +2 AP for their first round.
+    ("Prysipitate-O-Mat", [(0.5, 'ap')]),
+
+    #The bearer gains +3 AP for their first round but also loses 2 MP.
+    ("Shiny Prysipitate", [(0.75, 'ap'), (-0.5, 'mp')]),
+
+    #The bearer gains +4 AP for their first round but also loses 4 MP.
+    ("Iridescent Prysipitate", [(1, 'ap'), (-1, 'mp')]),
+
+    #The bearer gains 250 AP Parry on the first turn, then 50 AP Parry on the second turn.
+    ("Spryritual", [(100, 'apres')]),
+
+    #The bearer gains 250 MP Parry on the first turn, then 50 MP Parry on the second turn.
+    ("Prysical", [(100, 'mpres')]),
+
+    #At the end of their first turn, the bearer reduces damage by 5% (3 turns) for each enemy (excluding summons) in their line of sight.
+    ("Caraprys", [(7.5, 'respermee'), (7.5, 'resperran')]),
+
+    #TODO: find better way to add weight to Disaprys
+    #The bearer becomes invisible (1 turn) at the start of their first round.
+    ("Disaprys", [(0.5, 'hp', LEVEL)]),
+
+    #TODO: find better way to add weight to Prywitchment
+    #Reduces the duration of active effects on the bearer by 4 at the start of their first round.
+    ("Prywitchment", [(0.5, 'hp', LEVEL)]),
+
+    #The bearer gains 200% of their level in shield (infinite) for each opponent (excluding summons) that plays before them.
+    ("Pryshield", [(2 * 1.5, 'hp', LEVEL)]),
+
+    #The bearer gains 2% close-combat damage for 3 turns for each enemy fighter within 3 cells or less of the bearer at the start of their first turn.
+    ("Pryximity", [(2 * 2 * 0.5, 'permedam')]),
+
+    #The bearer reduces all types of damage suffered by 80% on the first turn.
+    ("Prymune", [(80 * 0.18, 'respermee'), (80 * 0.18, 'resperran')]),
+
+    #The bearer gains the Gravity state as long as they have not suffered any damage. If they suffer damage, the duration of the state changes to 1 turn.
+    ("Gravprysy", [(50, 'dodge'), (50, 'lock')]),
+
+    #If the bearer is in close contact with an enemy at the start of their turn, they gain 20 MP Reduction for 1 turn; if not, they gain 30 Lock. When the bearer kills an opponent (excluding summons) with direct damage, they gain 1 MP until the end of the fight, stackable max. 3 times.
+    ("War's Halbaxe", [(10, 'mpres'), (15, 'lock'), (0.25, 'mp')]),
+
+    #TODO: find better way to add weight to Corruption Pestilence
+    #When the caster returns to 100% HP via healing or a health steal, they apply a start-of-turn poison in their best element on entities two cells away or less. The poison lasts 2 turns, cannot be unbewitched, and can be stacked a maximum of 1 time.
+    ("Corruption Pestilence", [(2, 'permedam'), (2, 'perrandam')]),
+
+    #TODO: find better way to add weight to Servitude's Embrace
+    #At the end of each turn, the bearer attracts entities in a 3-cell cross around themself by 2 cells. If the bearer has no entities next to them at the end of their turn, they enter the Unmovable state until the start of their next turn. The state is removed if they suffer damage.
+    ("Servitude's Embrace", [(20, 'dodge'), (20, 'lock')]),
+
+    #When the bearer suffers an AP, MP or Range reduction, the damage they suffer is reduced by 4% for 2 turns. Damage suffered by the attacker is increased by 4% for 2 turns. Stackable max. 3 times.
+    ("Misery's Flail-Scale", [(4, 'respermee'), (4, 'resperran')]),
+
+    #Equivalent to dmg * 10 (includes summon buff)
+    #Starting on turn 5, the bearer and their summons gain up to 64 Damage until the end of the fight.\nThis bonus is reduced each time the bearer inflicts damage on an enemy during their turn for each of the first 4 turns of the fight:\nNo attacks: 16 Damage\n1 attack: 8 Damage\n2 attacks or more: 0 Damage
+    ('Domakuro', [(8, 'neutdam'), (8, 'earthdam'), (8, 'firedam'), (8, 'airdam'), (8, 'waterdam')]),
+
+    #Equivalent to 20 (avg vit weight) + lvl * 1.25
+    #Applies 100% of level as Shield at the start of each turn for the first 5 turns. \nDuring each of these 5 turns, if the caster kills a summons, the caster gains 100% of their level as shield for 2 turns (max. 4 times), and 300% (max. 2 times) for a monster or player.\nShields are only obtained during the caster's turn.
+    ('Dorigami', [(20 * 1.25, LEVEL)]),
+
+    #Bontarian Shield: When the bearer is unbewitched or debuffed, the bearer gains 100% of their level as shield for 1 turn.\nBrakmarian Power: Whenever the bearer inflicts or suffers pushback damage, the bearer gains 100 Power for 1 turn.\nNightmare Eye: If the bearer triggers Bontarian Shield and Brakmarian Power in the same turn, the damage they inflict and suffer increases by 10% for 1 turn.\nThe effects can only be triggered once per turn.
+    ("Nightmare Dofus", [(0.5, 'hp', LEVEL), (40, 'pow'), (4, 'permedam'), (4, 'perrandam')]),
+
+    #For each MP used, the bearer gains 8 Power for 2 turns, stackable 20 times. If the bearer does not use any MP, they are healed for 10% of their HP at the end of their turn.
+    ("Sylvan Dofus 2", [(50, 'pow'), (4500.0 * 10 / 100 * 0.2 / 200, 'hp', LEVEL)]),
+]
+
+
+def resolve_special_item_values(structure):
+    """
+    SPECIAL_ITEM_VALUES with item ids instead of names. A name that isn't
+    in the item database raises here, when the model is loaded.
+    """
+    resolved = []
+    for item_name, terms in SPECIAL_ITEM_VALUES:
+        item = structure.get_item_by_name(item_name)
+        if item is None:
+            raise ValueError('Special item %s is not in the item database' % item_name)
+        resolved.append((item.id, terms))
+    return resolved
+
+
+def get_special_item_weights(special_item_values, objective_values, level):
+    """
+    Objective weight of each special item id for these objective values.
+    """
+    factor_values = dict(objective_values)
+    factor_values[LEVEL] = level
+    weights = {}
+    for item_id, terms in special_item_values:
+        weight = 0
+        for term in terms:
+            value = term[0]
+            for factor in term[1:]:
+                value *= factor_values.get(factor, 0)
+            weight += value
+        weights[item_id] = weights.get(item_id, 0) + weight
+    return weights
+
+
+def scale_with_objective(special_item_values, objective_values, item_ids):
+    """
+    Whether the weights of these special items are proportional to the
+    objective values, i.e. none of their terms is a constant or a product of
+    several nonzero objective values.
+    """
+    for item_id, terms in special_item_values:
+        if item_id not in item_ids:
+            continue
+        for term in terms:
+            factors = [factor for factor in term[1:] if factor != LEVEL]
+            if len(factors) != 1 and all(objective_values.get(factor, 0) for factor in factors):
+                return False
+    return True
@@ -16,131 +16,252 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from .fashionista_config import get_fashionista_path
-from pulp import LpVariable, LpInteger, LpProblem, LpMaximize, LpStatus, value
-import pulp
-import os
-import uuid
-import platform
-
-# Print debug information to confirm platform details
-print(f"System: {platform.system()}")
-print(f"Machine: {platform.machine()}")
-
-# Initialize solver variable
-SOLVER = None
-
-# Handle different platforms
-if platform.system() == 'Windows':
-    # Windows implementation
-    print("Detected Windows system. Looking for CBC solver...")
-    
-    # Check user home directory for .pulp/pulp.cfg which might contain solver path
-    pulp_cfg = os.path.join(os.path.expanduser("~"), ".pulp", "pulp.cfg")
-    if os.path.exists(pulp_cfg):
-        print(f"Found PuLP configuration at {pulp_cfg}")
-        # Use the default solver configured in the .pulp/pulp.cfg file
-        try:
-            SOLVER = pulp.PULP_CBC_CMD(msg=False, timeLimit=90)
-            print("Using CBC solver from configuration")
-        except Exception as e:
-            print(f"Error loading solver from config: {e}")
-    
-    # Try to find CBC in the project directory
-    if SOLVER is None:
-        try:
-            cbc_path = os.path.join(get_fashionista_path(), 'solvers', 'cbc', 'bin', 'cbc.exe')
-            if os.path.isfile(cbc_path):
-                print(f"Found CBC at {cbc_path}")
-                SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
-            else:
-                print(f"CBC not found at {cbc_path}")
-                # Fall back to default solver
-                SOLVER = pulp.PULP_CBC_CMD(msg=False, timeLimit=90)
-                print("Using default PuLP solver")
-        except Exception as e:
-            print(f"Error setting up solver: {e}")
-            # Last resort - use default solver with no specific configuration
-            SOLVER = pulp.CBC()
-            print("Using minimal CBC solver")
-
-elif platform.system() == 'Linux' and ('arm' in platform.machine() or 'aarch64' in platform.machine()):
-    # On Raspberry Pi (ARM architecture, both 32-bit and 64-bit)
-    cbc_path = '/usr/bin/cbc'
-    print(f"Detected ARM architecture. Using system-installed CBC at: {cbc_path}")
-    if not os.path.isfile(cbc_path):
-        raise FileNotFoundError(f"CBC binary not found at {cbc_path}")
-    SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
-else:
-    # On AWS or other x86_64 systems
-    cbc_path = os.path.join(get_fashionista_path(), 'fashionistapulp', 'fashionistapulp', 'cbc')
-    print(f"Detected non-ARM Linux system. Using project-specific CBC at: {cbc_path}")
-    if not os.path.isfile(cbc_path):
-        raise FileNotFoundError(f"CBC binary not found at {cbc_path}")
-    SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
-
-# Confirm which solver is being used
-if hasattr(SOLVER, 'path'):
-    print(f"Using CBC solver at: {SOLVER.path}")
-else:
-    print("Using default PuLP solver configuration")
+from .reduction import Reduction
+from .solve_handle import SolveHandle
+from .solve_policy import SolvePolicy, relative_gap
+from .solver_admission import get_solver_admission
+from .solver_backends import get_backend
+from pulp import (LpAffineExpression, LpVariable, LpInteger, LpProblem, LpMaximize, LpStatus, LpStatusNotSolved,
+                  LpStatusInfeasible, LpStatusOptimal, LpSolutionInfeasible)
+import time
+
+# Part of the time budget the LP relaxation of the preflight may use.
+PREFLIGHT_TIME_SHARE = 0.1
+# Relative slack allowed between an objective and the relaxation bound.
+BOUND_TOLERANCE = 1e-6
 
 class LpProblem2:
     
     def __init__(self):
         self.pulp_vars = {}
+        self.variables_list = []
+        self.variable_positions = {}
+        # Objective coefficient of each variable, by position.
+        self.objective = []
+        self.categories = []
+        self.row_positions = {}
+        self.column_rows = None
+        self.adjustable_coefficients = set()
+        self.reduction = Reduction()
         #self.model_output = open('model.txt', 'w')
         self.pulp_lp = LpProblem("The Whiskas Problem", LpMaximize)
+        self.backend_cache = {}
+        self.initial_values = None
+        self.policy = SolvePolicy()
+        self.handle = SolveHandle()
+        self.node_count = None
+        self.gap = None
+        self.hit_limit = False
+        self.queue_wait = 0.0
+        self.relaxation_bound = None
         
-    def run(self):
-        problem_name = '/tmp/problem_%s' % str(uuid.uuid4())
-        self.pulp_lp.name = problem_name
-        self.pulp_lp.solve(SOLVER)
-        print('Status: %s, Z = %g' % (LpStatus[self.pulp_lp.status], value(self.pulp_lp.objective)))
+    def run(self, backend=None, initial_values=None, policy=None, handle=None):
+        self.handle = handle if handle is not None else SolveHandle()
+        self.handle.check()
+        self.initial_values = initial_values
+        self.node_count = None
+        self.gap = None
+        self.hit_limit = False
+        self.relaxation_bound = None
         
-        tmpMps = os.path.join('%s-pulp.mps' % problem_name)
-        tmpSol = os.path.join('%s-pulp.sol' % problem_name)
-        try: os.remove(tmpMps)
-        except: print('could not remove file %s' % tmpMps)
-        try: os.remove(tmpSol)
-        except: print('could not remove file %s' % tmpSol)
+        admission = get_solver_admission()
+        slot, self.queue_wait = admission.acquire(self.handle)
+        try:
+            policy = policy if policy is not None else SolvePolicy()
+            start = time.time()
+            backend = get_backend(backend)
+            is_feasible = True
+            if policy.preflight:
+                self.policy = policy.within(PREFLIGHT_TIME_SHARE * self.get_time_left(policy, start))
+                is_feasible = self.run_preflight(backend)
+            if is_feasible:
+                # The relaxation's time comes out of the budget.
+                self.policy = policy.within(self.get_time_left(policy, start))
+                backend.solve(self)
+        finally:
+            admission.release(slot)
+        if self.pulp_lp.status == LpStatusOptimal:
+            self.reduction.restore(self.variables_list, self.constraints())
+        if (self.gap is None and self.relaxation_bound is not None
+            and self.pulp_lp.status == LpStatusOptimal):
+            # Looser than the gap to the final bound, but better than none.
+            # An objective above the bound means the bound is wrong.
+            objective = self.get_objective_value()
+            bound = self.relaxation_bound
+            if objective is not None and objective <= bound + BOUND_TOLERANCE * max(1.0, abs(bound)):
+                self.gap = relative_gap(objective, bound)
+        print('Status: %s, Z = %s, gap = %s, nodes = %s, queued %.2fs, %s'
+              % (LpStatus[self.pulp_lp.status], self.get_objective_value(), self.gap,
+                 self.node_count, self.queue_wait, self.reduction))
+
+    def get_time_left(self, policy, start):
+        """
+        Seconds left of the policy's time budget since start, and before the
+        handle's deadline, which also counts the time spent in line.
+        """
+        time_left = policy.time_limit - (time.time() - start)
+        remaining = self.handle.remaining()
+        if remaining is not None:
+            time_left = min(time_left, remaining)
+        return max(0.0, time_left)
+
+    def run_preflight(self, backend):
+        """
+        Solves the LP relaxation, whose objective bounds the MIP one. When even
+        the relaxation is infeasible, the problem is marked infeasible without
+        going through branch and bound and False is returned.
+        """
+        status, self.relaxation_bound = backend.solve_relaxation(self)
+        if status != LpStatusInfeasible:
+            return True
+        for var in self.variables_list:
+            var.varValue = None
+        self.pulp_lp.assignStatus(LpStatusInfeasible, LpSolutionInfeasible)
+        return False
+
+    def variables(self):
+        return list(self.variables_list)
+
+    def constraints(self):
+        return list(self.pulp_lp.constraints.values())
 
     def get_result(self):
         return {v.name: v.varValue for v in self.pulp_lp.variables()}
 
-    def setup_variable(self, category, id, min_bound, max_bound):
+    def get_row_position(self, restriction):
+        return self.row_positions[restriction.name]
+
+    def get_column_rows(self):
+        """
+        Positions of the rows each column appears in.
+        """
+        if self.column_rows is None:
+            column_rows = [[] for _ in self.variables_list]
+            variable_positions = self.variable_positions
+            for row, constraint in enumerate(self.constraints()):
+                for var in constraint.keys():
+                    column_rows[variable_positions[var.name]].append(row)
+            self.column_rows = column_rows
+        return self.column_rows
+
+    def set_reduction(self, reduction):
+        self.reduction = reduction
+
+    def get_values(self, indices):
+        variables_list = self.variables_list
+        return [variables_list[i].varValue for i in indices]
+
+    def variable_name(self, category, id):
         sanitized_id = str(id).replace(' ', '_').replace('-', '_')
-        name = '%s_%s' % (category, sanitized_id)
+        return '%s_%s' % (category, sanitized_id)
+
+    def setup_variable(self, category, id, min_bound, max_bound):
+        name = self.variable_name(category, id)
         pulpVar = LpVariable(name, min_bound, max_bound, LpInteger)
         self.pulp_vars[name] = pulpVar
+        # Position of the variable in variables(), which solver output follows.
+        position = self.variable_positions.get(name)
+        if position is None:
+            position = len(self.variables_list)
+            self.variable_positions[name] = position
+            self.variables_list.append(pulpVar)
+            self.objective.append(0.0)
+        else:
+            self.variables_list[position] = pulpVar
+        if category not in self.categories:
+            self.categories.append(category)
+        return position
 
     def init_objective_function(self):
-        self.obj_vars = {}
+        self.objective = [0.0] * len(self.variables_list)
 
     def add_to_of(self, category, id, weight):
-        sanitized_id = str(id).replace(' ', '_').replace('-', '_')
-        var_name = '%s_%s' % (category, sanitized_id)
-        if self.obj_vars.get(var_name) == None:
-            self.obj_vars[var_name] = weight
-        else:
-            self.obj_vars[var_name] += weight
+        position = self.variable_positions.get(self.variable_name(category, id))
+        if position is not None:
+            self.objective[position] += weight
+
+    def set_objective_coefficient(self, category, id, coefficient):
+        self.objective[self.variable_positions[self.variable_name(category, id)]] = coefficient
+
+    def get_objective_coefficient(self, category, id):
+        position = self.variable_positions.get(self.variable_name(category, id))
+        return self.objective[position] if position is not None else 0
 
     def finish_objective_function(self):
-        self.pulp_lp.objective = sum([value * self.pulp_vars[key] for key, value in
-                         self.obj_vars.items() if key in self.pulp_vars])
+        # The backends read the objective vector, only PuLP's own solvers
+        # need it as an expression.
+        self.pulp_lp.objective = None
+
+    def get_pulp_objective(self):
+        self.pulp_lp.objective = LpAffineExpression(
+            [(var, coef) for var, coef in zip(self.variables_list, self.objective) if coef])
+        return self.pulp_lp.objective
+
+    def get_objective_value(self):
+        total = 0.0
+        for var, coef in zip(self.variables_list, self.objective):
+            if coef:
+                if var.varValue is None:
+                    return None
+                total += coef * var.varValue
+        return total
         
     def restriction_lt_eq(self, max_bound, parcels):
         restriction = sum([parcel[0] * self.pulp_vars['%s_%s' % (parcel[1], str(parcel[2]).replace(' ', '_').replace('-', '_'))] 
                             for parcel in parcels]) <= max_bound
-        self.pulp_lp += restriction
+        self.add_restriction(restriction)
         return restriction
         
 
     def restriction_eq(self, max_bound, parcels):
         restriction = sum([parcel[0] * self.pulp_vars['%s_%s' % (parcel[1], str(parcel[2]).replace(' ', '_').replace('-', '_'))] 
                             for parcel in parcels]) == max_bound
-        self.pulp_lp += restriction
+        self.add_restriction(restriction)
         return restriction
         
+    def restriction_eq_by_position(self, max_bound, terms):
+        """
+        Same as restriction_eq, with (coefficient, position in variables())
+        terms, so that the expression is built in one go.
+        """
+        variables_list = self.variables_list
+        restriction = LpAffineExpression([(variables_list[position], coef)
+                                          for coef, position in terms]) == max_bound
+        self.add_restriction(restriction)
+        return restriction
+
+    def add_restriction(self, restriction):
+        # Named after its position in constraints(), to find it back in solver input.
+        position = len(self.pulp_lp.constraints)
+        self.pulp_lp.addConstraint(restriction, 'R%d' % position)
+        self.row_positions[restriction.name] = position
+
+    def make_adjustable(self, restriction, category, id):
+        """
+        Lets set_coefficient() change the coefficient of a variable in a
+        restriction between solves. Solver backends that keep a model around
+        only look for changes in the adjustable coefficients.
+        """
+        self.adjustable_coefficients.add((self.get_row_position(restriction),
+                                          self.variable_positions[self.variable_name(category, id)]))
+
+    def set_coefficient(self, restriction, category, id, coefficient):
+        restriction[self.pulp_vars[self.variable_name(category, id)]] = coefficient
+
+    def reset_solution(self):
+        for var in self.pulp_vars.values():
+            var.varValue = None
+        self.pulp_lp.assignStatus(LpStatusNotSolved)
+        self.initial_values = None
+        self.handle = SolveHandle()
+        self.node_count = None
+        self.gap = None
+        self.hit_limit = False
+        self.queue_wait = 0.0
+        self.relaxation_bound = None
+
+    def get_rhs(self, restriction):
+        return -restriction.constant
+
     def get_status(self):
         return LpStatus[self.pulp_lp.status]
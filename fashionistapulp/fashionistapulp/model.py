@@ -17,33 +17,84 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 from .dofus_constants import TYPE_NAME_TO_SLOT_NUMBER, STAT_MAXIMUM, SOFT_CAPS
+from .item_valuations import get_special_item_weights, resolve_special_item_values
 from .lpproblem import LpProblem2
+from .model_artifact import load_model_artifact, save_model_artifact
 from .modelresult import ModelResultMinimal
+from .reduction import Reduction
 import pulp
 from .restrictions import Restrictions
+from .solve_policy import SolveStatus
+from .solver_backends import get_fallback_backend_names
 from .structure import get_structure
 
 from collections import Counter
+import copy
+import itertools
 
 
+# Attributes set by create_structure, which are not saved in the artifact.
+STRUCTURE_ATTRIBUTES = ['structure', 'items_list', 'sets_list', 'stats_list', 'main_stats_list',
+                        'special_item_values']
+
+# Solves run_lazy_conditions() makes before falling back to the full model.
+MAX_LAZY_ROUNDS = 10
+
+# Big-M constants of the rows tighten_big_m() rewrites for each input.
+MIN_CONDITION_BIG_M = 10000
+MAX_CONDITION_BIG_M = 100000
+STAT_POINTS_BIG_M = 2000
+
+# Minimum of the stats the input sets no minimum for.
+NO_MINIMUM_STAT = -10000
+
+# ModelInput attributes setup() compares with those of the previous input.
+SETUP_PARTS = ['char_level', 'base_stats_by_attr', 'minimum_stats', 'locked_equips',
+               'forbidden_equips', 'objective_values', 'options', 'char_class',
+               'stat_points_to_distribute']
+
 class Model:
     
-    def __init__(self):
+    # Off, the big-M constants above are used as they are, to compare.
+    tighten_big_m_enabled = True
+    # Parts of the input the constraints and objective were last set up for.
+    last_setup = None
+    
+    def __init__(self, compiled_state=None, max_level=None):
+        """
+        Builds the model, or takes the variables and constraints from a
+        state returned by get_compiled_state() or saved in the artifact.
+        With max_level, only the items up to that level are in the model.
+        """
+        self.max_level = max_level
         self.create_structure()
         
+        if compiled_state is None:
+            compiled_state = load_model_artifact(max_level)
+        if compiled_state is not None:
+            self.__dict__.update(compiled_state)
+            return
+        
         self.problem = LpProblem2()
         self.restrictions = Restrictions()
         self.item_count = len(self.items_list)
         
         self.create_variables()
         self.create_constraints()
+        save_model_artifact(self.get_compiled_state(), max_level)
+        
+    def get_compiled_state(self):
+        return {name: attribute for name, attribute in self.__dict__.items()
+                if name not in STRUCTURE_ATTRIBUTES}
         
     def create_structure(self):
         self.structure = get_structure()
-        self.items_list = self.structure.get_available_items_list()
+        self.items_list = [item for item in self.structure.get_available_items_list()
+                           if self.is_in_level_band(item)]
         self.sets_list = self.structure.get_sets_list()
         self.stats_list = self.structure.get_stats_list()
         self.main_stats_list = self.structure.get_main_stats_list()
+        self.special_item_values = resolve_special_item_values(self.structure)
 
     def create_variables(self):
         self.create_item_number_variables()
@@ -67,9 +118,10 @@ class Model:
                     self.problem.setup_variable('capped_resist', var_id, 0, 50)
     
     def create_item_number_variables(self):
+        self.item_var_indices = []
         for item in self.items_list:
             max_number = 2 if self.structure.get_type_name_by_id(item.type) == 'Ring' and item.set == None else 1
-            self.problem.setup_variable('x', item.id, 0, max_number)    
+            self.item_var_indices.append(self.problem.setup_variable('x', item.id, 0, max_number))
     
     def create_item_presence_variables(self):
         for item in self.items_list:
@@ -78,26 +130,63 @@ class Model:
     def create_set_variables(self):
         self.set_count = len(self.sets_list)     
      
+        self.set_tiers = []
+        self.set_slot_var_indices = []
         for item_set in self.sets_list:
-            self.problem.setup_variable('s', item_set.id, 0, 9)
-            for slot_number in range(0, 10):
-                self.problem.setup_variable('ss', '%d_%d' % (item_set.id, slot_number), 0, 1)    
+            tiers = self.get_set_tiers(item_set)
+            self.set_tiers.append(tiers)
+            if tiers:
+                self.problem.setup_variable('s', item_set.id, 0, tiers[-1][1])
+            # Named after the fewest pieces of the tier plus one, like the set bonuses.
+            self.set_slot_var_indices.append({fewest + 1: self.problem.setup_variable('ss', '%d_%d' % (item_set.id, fewest + 1), 0, 1)
+                                              for fewest, _ in tiers})
+    
+    def get_set_tiers(self, item_set):
+        """
+        The numbers of pieces of a set that need telling apart, as (fewest,
+        most) ranges: each number of pieces with a bonus on its own, and
+        those without one grouped as long as the light set rules treat them
+        the same (0 or 1, 2, 3, 4 or more). Empty for sets that can't give
+        a bonus.
+        """
+        number_of_items = len(self.get_valid_items_in_set(item_set))
+        bonus_tiers = set(num_items for num_items, _, _ in item_set.bonus)
+        if not any(2 <= num_items <= number_of_items for num_items in bonus_tiers):
+            return []
+        tiers = []
+        for num_items in range(0, number_of_items + 1):
+            if (tiers and num_items not in bonus_tiers and tiers[-1][0] not in bonus_tiers
+                and min(max(tiers[-1][0], 1), 4) == min(max(num_items, 1), 4)):
+                tiers[-1] = (tiers[-1][0], num_items)
+            else:
+                tiers.append((num_items, num_items))
+        return tiers
+    
+    def get_valid_items_in_set(self, item_set):
+        s = get_structure()
+        return [item for item in item_set.items
+                if not s.get_item_by_id(item).removed and self.is_in_level_band(s.get_item_by_id(item))]
+    
+    def is_in_level_band(self, item):
+        return self.max_level is None or item.level <= self.max_level
 
     def create_stat_total_variables(self):
         self.stat_count = len(self.stats_list)
      
+        self.stat_var_indices = []
         for stat in self.stats_list:
             if stat.name in STAT_MAXIMUM:
-                self.problem.setup_variable('stat', stat.id, None, STAT_MAXIMUM[stat.name])
+                self.stat_var_indices.append(self.problem.setup_variable('stat', stat.id, None, STAT_MAXIMUM[stat.name]))
             else:
-                self.problem.setup_variable('stat', stat.id, None, None)
+                self.stat_var_indices.append(self.problem.setup_variable('stat', stat.id, None, None))
 
     def create_stat_points_variables(self):
         self.stat_count = len(self.stats_list)
         
+        self.stat_point_var_indices = []
         for stat in self.main_stats_list:
             for i in range(0, 6):
-                self.problem.setup_variable('stat_point', 'statpoint_%d_%d' % (i, stat.id), 0, None)  
+                self.stat_point_var_indices.append(self.problem.setup_variable('stat_point', 'statpoint_%d_%d' % (i, stat.id), 0, None))
             for i in range(0, 5):  
                 self.problem.setup_variable('stat_point_max', 'statpointmax_%d_%d' % (i, stat.id), 0, 1)  
     
@@ -110,464 +199,11 @@ class Model:
         self.problem.setup_variable('prysmaradite', 1, 0,  1)
         
         
-    def add_weird_item_weights_to_objective_funcion(self, objective_values, level):    
-
-        #Crimson Dofus
-        #Deep Crimson: When attacked, the bearer gains 1% final damage for 2 turns (stackable 10 times).
-        crimson_dofus_new_stat_weight = objective_values.get('permedam', 0) * 7 + objective_values.get('perrandam', 0) * 7
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Crimson Dofus').id, 
-                               crimson_dofus_new_stat_weight)
-        
-        #Adding more weight to Emerald Dofus equivalent to 0.5 * level HP
-        #At the end of the turn, gives 100% of the owner's level in shield points for each adjacent enemy.\nSummons are not counted.
-        emerald_dofus_new_stat_weight = objective_values.get('hp', 0) * 0.5 * level
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Emerald Dofus').id, 
-                               emerald_dofus_new_stat_weight)
-        
-        #Adding more weight to Turquoise Dofus equivalent to 5 CH
-        #For each Critical Hit inflicted, the final damage is increased by 1% for 3 turns. Can be stacked 10 times.
-        turq_dofus_new_stat_weight = objective_values.get('ch', 0) * 5   
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Turquoise Dofus').id, 
-                               turq_dofus_new_stat_weight)
-        
-        #adding random stats to dofusteuse 75 per stat average
-        #Increases one elemental characteristic per game turn: 300 to Chance, then 300 to Strength, then 300 to Agility, and then 300 to Intelligence.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Dofusteuse').id, 
-                               objective_values.get('agi', 0) * 75)
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Dofusteuse').id, 
-                               objective_values.get('cha', 0) * 75)
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Dofusteuse').id, 
-                               objective_values.get('int', 0) * 75)
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Dofusteuse').id, 
-                               objective_values.get('str', 0) * 75)
-        
-        #Adding more weight to Cawwot Dofus equivalent to 12.5 MP Loss Res + 12.5 AP Loss Res
-        #Gives 25 AP Parry if an AP penalty is suffered, or 25 MP Parry if an MP penalty is suffered. \nThe two effects last 1 turn and do not stack.
-        cawwot_dofus_new_stat_weight = objective_values.get('apres', 0) * 12.5 + objective_values.get('mpres', 0) * 12.5
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Cawwot Dofus').id, 
-                               cawwot_dofus_new_stat_weight)
-        
-        #Adding more weight to Vulbis Dofus equivalent to 5% damage + 10 lock
-        #Increases damage inflicted by 10% for 1 turn if the bearer has suffered no damage from enemies since the last turn.\nOtherwise, gives 20 Lock.
-        vulbis_dofus_new_stat_weight = objective_values.get('permedam', 0) * 5 + objective_values.get('perrandam', 0) * 5 + objective_values.get('lock', 0) * 10
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Vulbis Dofus').id, 
-                               vulbis_dofus_new_stat_weight)
-        
-        #Adding more weight to Black-Spotted Dofus
-        #If the bearer inflicts damage during their turn, they and their allies carrying the Dorigami gain 20 damage for 1 turn.\n\nIf the bearer does not inflict damage, they and their allies carrying the Domakuro gain 150% of their respective levels in shield for 1 turn.
-        black_spotted_dofus_new_stat_weight = objective_values.get('dam', 0) * 10 + objective_values.get('hp', 0) * 150 * level / 200 / 2
-        self.problem.add_to_of('p',
-                                 self.structure.get_item_by_name('Black-Spotted Dofus').id,
-                                 black_spotted_dofus_new_stat_weight)
-        
-        #Ebony Dofus
-        #Ebony Black: When the bearer attacks in close combat during their turn, they gain 1% ranged damage for 3 turns (stackable 10 times).\nWhen they attack from long range, they gain 1% close-combat damage for 3 turns (stackable 10 times).\nTriggering both effects during the turn allows the next attack to apply a 16 poison in its element for 2 turns (stackable 2 times, once every 2 turns).
-        ebony_dofus_new_stat_weight = objective_values.get('permedam', 0) * 5 + objective_values.get('perrandam', 0) * 5 + objective_values.get('pow', 0) * 16 * level / 200
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Ebony Dofus').id, 
-                               ebony_dofus_new_stat_weight)
-        
-        #Adding more weight to Ivory Dofus equivalent to 10% res distance and melee
-        #The bearer reduces damage from one out of five attacks by 50%. The reduction is lost if this one is sacrificed.
-        ivory_dofus_new_stat_weight = objective_values.get('respermee', 0) * 10 + objective_values.get('resperran', 0) * 10
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name('Ivory Dofus').id,
-                                ivory_dofus_new_stat_weight)
-        
-        #Adding more weight to Ochre Dofus equivalent to 0.2 AP + 16 Dodge
-        #Gives 1 AP for 1 turn if the bearer has suffered no damage from enemies since the last turn.\nOtherwise, gives 20 Dodge.
-        ochre_dofus_new_stat_weight = objective_values.get('ap', 0) * 0.2 + objective_values.get('dodge', 0) * 16
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Ochre Dofus').id, 
-                               ochre_dofus_new_stat_weight)
-        
-        #Cloudy Dofus
-        #On odd turns, the bearer gains 20% final damage but loses 10% final healing.\nOn even turns, the bearer gains 20% final healing but loses 10% final damage.
-        cloudy_dofus_new_stat_weight = objective_values.get('permedam', 0) * 5 + objective_values.get('perrandam', 0) * 5 + objective_values.get('heals', 0) * 5
-        self.problem.add_to_of('p',
-                                 self.structure.get_item_by_name('Cloudy Dofus').id,
-                                 cloudy_dofus_new_stat_weight)
-        
-        #TODO: find better way to add weight to Watchers Dofus
-        #Adding more weight to Watchers Dofus equivalent to 10 heals
-        #At the end of the turn, returns 7% HP to aligned allies. 
-        watchers_dofus_new_stat_weight = (objective_values.get('heals', 0) * 10 + 2500) * level / 200.0
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Watchers Dofus').id, 
-                               watchers_dofus_new_stat_weight)
-        
-        #Adding more weight to Dokoko
-        #Every 3 turns starting on turn 3, returns 10% of their maximum health points.
-        dokoko_new_stat_weight = objective_values.get('hp', 0) * (4500.0 * 10 / 100) * (1/3) * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name('Dokoko').id,
-                                dokoko_new_stat_weight)
-        
-        #Abyssal Dofus
-        #At the start of each turn, if there are no enemies in close combat, gives 1 MP. Otherwise, gives 1 AP.
-        abyssal_dofus_new_stat_weight = objective_values.get('ap', 0) * 2.5 + objective_values.get('mp', 0) * 2.5
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Abyssal Dofus').id, 
-                               abyssal_dofus_new_stat_weight)
-        
-        #Adding more weight to Lavasmith Dofus
-        #Applies 100% of level as shield points to its bearer, 1 time max per turn for pushback damage and 1 time for each type of movement: \n- pushback damage\n- pushback / attraction\n- place switching / teleportation / Eliotrope portal\n- carried by a Pandawa\n\nThe effect can only be triggered by enemies.
-        lavasmith_dofus_new_stat_weight = objective_values.get('hp', 0) * 100 * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name('Lavasmith Dofus').id,
-                                lavasmith_dofus_new_stat_weight)
-        
-        #Adding more weight to Silver Dofus equivalent to some HP
-        #As soon as the bearer falls below 20% of their health points, the Dofus's effect is triggered.\nAt the start of their next turn: heals 20% HP (once per fight).
-        #Formula: expected life at lvl 200: 4500 - get 20% of that. 
-        #Multiply by 0.2, since you wont get the bonus too often
-        #Correct for level
-        silver_dofus_new_stat_weight = objective_values.get('hp', 0) * (4500.0 * 20 / 100) * 0.2 * level / 200
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Silver Dofus').id, 
-                               silver_dofus_new_stat_weight)
-        
-        #Adding more weight to Sparkling Silver Dofus equivalent to some HP
-        #As soon as the bearer falls below 20% of their health points, the Dofus's effect is triggered.\nAt the start of their next turn: heals 30% HP and gives 20% final damage for 1 turn (once per fight).
-        
-        #Formula: expected life at lvl 200: 4500 - get 40% of that. 
-        # Add 30% power to simulate final damage
-        # Multiply by 0.2, since you wont get the bonus too often
-        # Correct for level
-        sparkling_silver_dofus_new_stat_weight_hp = objective_values.get('hp', 0) * (4500.0 * 30 / 100) * 0.2 * level / 200
-        sparkling_silver_dofus_new_stat_weight_pow = objective_values.get('respermee', 0) * 20 * 0.2 + objective_values.get('resperran', 0) * 20 * 0.2
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Sparkling Silver Dofus').id, 
-                               sparkling_silver_dofus_new_stat_weight_hp)
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Sparkling Silver Dofus').id, 
-                               sparkling_silver_dofus_new_stat_weight_pow)
-        
-        #TODO: find better way to add weight to Crocobur
-        #Adding more weight to Crocobur equivalent to 200 HP * meleeness
-        #At the start of each turn, the bearer inflicts damage on themself in their best attack element to steal health from adjacent entities at the end of the caster's turn.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Crocobur 3").id, 
-                               objective_values.get('hp', 0) * level / 2 + objective_values.get('perrandam', 0) * level / 200)
-        
-        #Buhorado Feather
-        #When the bearer lands a critical hit, they gain 10 Pushback Damage for 3 turns (stackable 10 times).
-        #With crits, you can stack up to 100 Pushback Damage (10 stacks × 10)
-        #For crit builds (~60% crit): sustain ~6 stacks on average = 60 pushback damage
-        #More conservative: ~40-50 average pushback damage for crit builds
-        buhorado_feather_new_stat_weight = objective_values.get('pshdam', 0) * 45 * objective_values.get('ch', 0) / 100
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Buhorado Feather").id, 
-                               buhorado_feather_new_stat_weight)
-        
-        #Adding more weight to Fallanster's Rectitude equivalent to 2% HP
-        #If the bearer ends their turn with a line of sight to at least one opponent, they earn a 10% damage suffered reduction for 1 turn as long as they haven't been pushed, attracted, carried, teleported or transposed.
-        fallanster_new_stat_weight = objective_values.get('respermee', 0) * 8 + objective_values.get('resperran', 0) * 8
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Fallanster's Rectitude").id, 
-                               fallanster_new_stat_weight)
-        
-        #Adding more weight to Death-Defying equivalent to 2.5% res distance and melee
-        #Damage suffered by the bearer is increased by 15% whenever they have more than 50% HP, but damage suffered is reduced by 20% whenever they have less than 50% HP.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Death-Defying").id, 
-                               objective_values.get('respermee', 0) * 2.5 + objective_values.get('resperran', 0) * 2.5)
-        
-        #Adding more weight to Bram Worldbeard's Crown equivalent to 7.5% weapon damage
-        #When the bearer suffers an AP, MP or Range removal, they gain 3% weapon damage for 2 turns, stackable 5 times.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Bram Worldbeard's Crown").id, 
-                               objective_values.get('perweadam', 0) * 7.5)
-        
-        #Adding more weight to Ganymede's Diadem equivalent to 1 AP
-        #The bearer gains 2 AP on even turns and loses 1 AP on odd turns.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Ganymede's Diadem").id, 
-                               objective_values.get('ap', 0))
-        
-        #Adding more weight to Rykke Errel's Bravery equivalent to 400 hp and -10% ranged damage
-        #For each distance attack suffered, the bearer gains shield and loses ranged damage for 1 turn; stackable up to 5 times maximum. The damage penalty and shield values vary according to the distance between the bearer and their attacker.
-        #Will consider 3 distance attacks each turn
-        distance_attacks = 3
-        rikke_new_stat_weight = objective_values.get('hp', 0) * 200 * distance_attacks - objective_values.get('perrandam', 0) * 5 * distance_attacks
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Rykke Errel's Bravery").id, 
-                               rikke_new_stat_weight)
-        
-        #Adding more weight to Jahash Jurgen's Nobility equivalent to 1.5% resists (1-2 hits on each element)
-        #When the bearer suffers damage in an element, they gain 3% resistance in that element for 2 turns, stackable 5 times.
-        resists_to_consider = 1.5
-        jahash_new_stat_weight = (objective_values.get('neutresper', 0) * resists_to_consider
-                                  + objective_values.get('airresper', 0) * resists_to_consider
-                                  + objective_values.get('earthresper', 0) * resists_to_consider
-                                  + objective_values.get('fireresper', 0) * resists_to_consider
-                                  + objective_values.get('waterresper', 0) * resists_to_consider)
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Jahash Jurgen's Nobility").id, 
-                               jahash_new_stat_weight)
-        
-        #Adding more weight to Thousand-League Boots equivalent to 1 MP
-        #The bearer gains 2 MP on odd turns and loses 1 MP on even turns.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Thousand-League Boots').id, 
-                               objective_values.get('mp', 0))
-        
-        #Adding more weight to Kicked Ass Boots equivalent to 30 Dodge and 50 Pushback Damage
-        #At the start of each turn, the bearer pushes entities in close combat back 2 cells.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Kicked Ass Boots").id, 
-                               objective_values.get('dodge', 0) * 30 + objective_values.get('pshdam', 0) * 50)
-        
-        #Adding more weight to Dodge's Audacity equivalent to 50 dodge, 5% critical hits and 40 pushback damage
-        #At the start of each turn, the caster randomly teleports to an adjacent cell. If the move is impossible, they earn a +10% chance of critical hits and +80 Pushback Damage for 1 turn.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Dodge's Audacity").id, 
-                               objective_values.get('dodge', 0) * 50 + objective_values.get('ch', 0) * 5 + objective_values.get('pshdam') * 40)
-        
-        #Adding more weight to Lady Jhessica's Courage equivalent to 25 Lock
-        #At end of their turn, the bearer removes 100 Dodge from adjacent enemies for 1 turn.
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name("Lady Jhessica's Courage").id, 
-                               objective_values.get('lock', 0) * 50)
-        
-        #Adding more weight to Cocoa Dofus
-        #Each ranged attack suffered while you are in close combat with an enemy grants a chocolate mark.\n\nThese marks are consumed at the end of your turn; each one gives 25% of your level in shield for 1 turn.
-        cocoa_dofus_new_stat_weight = objective_values.get('hp', 0) * 50 * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Cocoa Dofus 2").id,
-                                cocoa_dofus_new_stat_weight)
-        
-        #Adding more weight to Prytekt
-        #The bearer gains 550% of their level in shield points on the first turn, 200% on the second turn and 100% on the third.
-        prytekt_new_stat_weight = objective_values.get('hp', 0) * ((0.7*550+0.85*200+100)/4) * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prytekt-O-Mat").id,
-                                prytekt_new_stat_weight)
-        #Shiny Prytekt
-        #The bearer gains 150% of their level in shield points on the first turn, 450% on the second turn and 150% on the third.
-        shiny_prytekt_new_stat_weight = objective_values.get('hp', 0) * ((0.7*150+0.85*450+150)/4) * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Shiny Prytekt").id,
-                                shiny_prytekt_new_stat_weight)
-
-        #Iridescent Prytekt
-        #The bearer gains 100% of their level in shield points on the first turn, 200% on the second turn and 350% on the third.
-        iridescent_prytekt_new_stat_weight = objective_values.get('hp', 0) * ((0.7*100+0.85*200+350)/4) * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Iridescent Prytekt").id,
-                                iridescent_prytekt_new_stat_weight)
-
-        #Pryssure
-        #The bearer gains 1 AP for 3 turns but inflicts -10% damage.
-        pryssure_new_stat_weight = objective_values.get('ap', 0) * 0.75 - objective_values.get('permedam', 0) * 7.5 - objective_values.get('perrandam', 0) * 7.5     
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Pryssure-O-Mat").id,
-                                pryssure_new_stat_weight)
-
-        #Shiny Pryssure
-        #The bearer gains 2 AP for 2 turns but inflicts -35% damage.
-        shiny_pryssure_new_stat_weight = objective_values.get('ap', 0) * 1 - objective_values.get('permedam', 0) * 17.5 - objective_values.get('perrandam', 0) * 17.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Shiny Pryssure").id,
-                                shiny_pryssure_new_stat_weight)
-
-
-        #Iridescent Pryssure
-        #The bearer gains 4 AP for 1 turn but inflicts -50% damage.
-        iridescent_pryssure_new_stat_weight = objective_values.get('ap', 0) * 1 - objective_values.get('permedam', 0) * 12.5 - objective_values.get('perrandam', 0) * 12.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Iridescent Pryssure").id,
-                                iridescent_pryssure_new_stat_weight)
-
-        #Surpryz
-        #The bearer gains 100% Critical on the first turn, 35% on the second turn and 15% on the third turn.
-        #For crit builds with ~60% base crit: Turn 1: +40% (capped at 100%), Turn 2: +35%, Turn 3: +15%
-        #Average effective bonus: (40 + 35 + 15) / 3 = 30% average for crit builds
-        surpryz_new_stat_weight = objective_values.get('ch', 0) * 20
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Surpryz").id,
-                                surpryz_new_stat_weight)
-
-        #Prynyang
-        #The bearer sacrifices 10% resistance to gain 10% final damage on the first turn, then gains 3% final damage and resistance on the second turn, and sacrifices 10% final damage to gain 10% resistance on the third turn.
-        #Turn 1: +10% damage, -10% res | Turn 2: +3% damage, +3% res | Turn 3: -10% damage, +10% res
-        #With optimal play: attack on turns 1-2 (13% damage total), defend on turn 3 (10% res when needed)
-        #Effective value: ~4-5% damage when attacking, ~3% res when defending
-        prynyang_new_stat_weight = (objective_values.get('permedam', 0) * 5 + objective_values.get('perrandam', 0) * 5 + 
-                                    objective_values.get('respermee', 0) * 4 + objective_values.get('resperran', 0) * 4)
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prynyang").id,
-                                prynyang_new_stat_weight)
-
-        #Prycapture
-        #The bearer gains 1 MP (2 turns) per enemy more than 15 cells away.
-        prycapture_new_stat_weight = objective_values.get('mp', 0) * 0.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prycapture").id,
-                                prycapture_new_stat_weight)
-
-        #Prygenerate
-        #Heals 15% of enemy damage suffered until the end of the third turn.
-        prygenerate_new_stat_weight = objective_values.get('hp', 0) * 0.15 * 3 * level
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prygenerate").id,
-                                prygenerate_new_stat_weight)
-
-        #Prysipitate
-        #The bearer gains +2 AP for their first round.
-        prysipitate_new_stat_weight = objective_values.get('ap', 0) * 0.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prysipitate-O-Mat").id,
-                                prysipitate_new_stat_weight)
-
-        #Shiny Prysipitate
-        #The bearer gains +3 AP for their first round but also loses 2 MP.
-        shiny_prysipitate_new_stat_weight = objective_values.get('ap', 0) * 0.75 - objective_values.get('mp', 0) * 0.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Shiny Prysipitate").id,
-                                shiny_prysipitate_new_stat_weight)
-
-        #Iridescent Prysipitate
-        #The bearer gains +4 AP for their first round but also loses 4 MP.
-        iridescent_prysipitate_new_stat_weight = objective_values.get('ap', 0) * 1 - objective_values.get('mp', 0) * 1
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Iridescent Prysipitate").id,
-                                iridescent_prysipitate_new_stat_weight)
-
-        #Spryritual
-        #The bearer gains 250 AP Parry on the first turn, then 50 AP Parry on the second turn.
-        spryritual_new_stat_weight = objective_values.get('apres', 0) * 100
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Spryritual").id,
-                                spryritual_new_stat_weight)
-
-        #Prysical
-        #The bearer gains 250 MP Parry on the first turn, then 50 MP Parry on the second turn.
-        prysical_new_stat_weight = objective_values.get('mpres', 0) * 100
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prysical").id,
-                                prysical_new_stat_weight)
-
-        #Caraprys
-        #At the end of their first turn, the bearer reduces damage by 5% (3 turns) for each enemy (excluding summons) in their line of sight.
-        caraprys_new_stat_weight = objective_values.get('respermee', 0) * 7.5 + objective_values.get('resperran', 0) * 7.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Caraprys").id,
-                                caraprys_new_stat_weight)
-
-        #TODO: find better way to add weight to Disaprys
-        #Disaprys
-        #The bearer becomes invisible (1 turn) at the start of their first round.
-        disaprys_new_stat_weight = objective_values.get('hp', 0) * 0.5 * level
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Disaprys").id,
-                                disaprys_new_stat_weight)
-
-        #TODO: find better way to add weight to Prywitchment
-        #Prywitchment
-        #Reduces the duration of active effects on the bearer by 4 at the start of their first round.
-        prywitchment_new_stat_weight = objective_values.get('hp', 0) * 0.5 * level
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prywitchment").id,
-                                prywitchment_new_stat_weight)
-
-        #Pryshield
-        #The bearer gains 200% of their level in shield (infinite) for each opponent (excluding summons) that plays before them.
-        pryshield_new_stat_weight = objective_values.get('hp', 0) * 2 * level * 1.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Pryshield").id,
-                                pryshield_new_stat_weight)
-
-        #Pryximity
-        #The bearer gains 2% close-combat damage for 3 turns for each enemy fighter within 3 cells or less of the bearer at the start of their first turn.
-        pryximity_new_stat_weight = objective_values.get('permedam', 0) * 2 * 2 * 0.5
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Pryximity").id,
-                                pryximity_new_stat_weight)
-
-        #Prymune
-        #The bearer reduces all types of damage suffered by 80% on the first turn.
-        prymune_new_stat_weight = (objective_values.get('respermee', 0) + objective_values.get('resperran', 0)) * 80 * 0.18
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Prymune").id,
-                                prymune_new_stat_weight)
-
-        #Gravprysy
-        #The bearer gains the Gravity state as long as they have not suffered any damage. If they suffer damage, the duration of the state changes to 1 turn.
-        gravprysy_new_stat_weight = objective_values.get('dodge', 0) * 50 + objective_values.get('lock', 0) * 50
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Gravprysy").id,
-                                gravprysy_new_stat_weight)
-
-        #War's Halbaxe
-        #If the bearer is in close contact with an enemy at the start of their turn, they gain 20 MP Reduction for 1 turn; if not, they gain 30 Lock. When the bearer kills an opponent (excluding summons) with direct damage, they gain 1 MP until the end of the fight, stackable max. 3 times.
-        wars_halbaxe_new_stat_weight = objective_values.get('mpres', 0) * 10 + objective_values.get('lock', 0) * 15 + objective_values.get('mp', 0) * 0.25
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("War's Halbaxe").id,
-                                wars_halbaxe_new_stat_weight)
-
-        #TODO: find better way to add weight to Corruption Pestilence
-        #Corruption Pestilence
-        #When the caster returns to 100% HP via healing or a health steal, they apply a start-of-turn poison in their best element on entities two cells away or less. The poison lasts 2 turns, cannot be unbewitched, and can be stacked a maximum of 1 time.
-        corruption_pestilence_new_stat_weight = objective_values.get('permedam', 0) * 2 + objective_values.get('perrandam', 0) * 2
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Corruption Pestilence").id,
-                                corruption_pestilence_new_stat_weight)
-
-        #TODO: find better way to add weight to Servitude's Embrace
-        #Servitude's Embrace
-        #At the end of each turn, the bearer attracts entities in a 3-cell cross around themself by 2 cells. If the bearer has no entities next to them at the end of their turn, they enter the Unmovable state until the start of their next turn. The state is removed if they suffer damage.
-        servitudes_embrace_new_stat_weight = objective_values.get('dodge', 0) * 20 + objective_values.get('lock', 0) * 20
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Servitude's Embrace").id,
-                                servitudes_embrace_new_stat_weight)
-
-        #Misery's Flail-Scale
-        #When the bearer suffers an AP, MP or Range reduction, the damage they suffer is reduced by 4% for 2 turns. Damage suffered by the attacker is increased by 4% for 2 turns. Stackable max. 3 times.
-        miserys_flail_scale_new_stat_weight = objective_values.get('respermee', 0) * 4 + objective_values.get('resperran', 0) * 4
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Misery's Flail-Scale").id,
-                                miserys_flail_scale_new_stat_weight)
-        
-        #Adding more weight to Domakuro equivalent to dmg * 10 (includes summon buff)
-        #Starting on turn 5, the bearer and their summons gain up to 64 Damage until the end of the fight.\nThis bonus is reduced each time the bearer inflicts damage on an enemy during their turn for each of the first 4 turns of the fight:\nNo attacks: 16 Damage\n1 attack: 8 Damage\n2 attacks or more: 0 Damage
-        domakuro_dofus_new_stat_weight = (objective_values.get('neutdam', 0) + 
-                                          objective_values.get('earthdam', 0) + 
-                                          objective_values.get('firedam', 0) + 
-                                          objective_values.get('airdam', 0) + 
-                                          objective_values.get('waterdam', 0)) * 8
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Domakuro').id, 
-                               domakuro_dofus_new_stat_weight)
-        #Adding more weight to Dorigami equivalent to 20 (avg vit weight) + lvl * 1.25
-        #Applies 100% of level as Shield at the start of each turn for the first 5 turns. \nDuring each of these 5 turns, if the caster kills a summons, the caster gains 100% of their level as shield for 2 turns (max. 4 times), and 300% (max. 2 times) for a monster or player.\nShields are only obtained during the caster's turn.
-        dorigami_dofus_new_stat_weight = 20 * level * 1.25
-        self.problem.add_to_of('p', 
-                               self.structure.get_item_by_name('Dorigami').id, 
-                               dorigami_dofus_new_stat_weight)
-        
-        #Nightmare Dofus
-        #Bontarian Shield: When the bearer is unbewitched or debuffed, the bearer gains 100% of their level as shield for 1 turn.\nBrakmarian Power: Whenever the bearer inflicts or suffers pushback damage, the bearer gains 100 Power for 1 turn.\nNightmare Eye: If the bearer triggers Bontarian Shield and Brakmarian Power in the same turn, the damage they inflict and suffer increases by 10% for 1 turn.\nThe effects can only be triggered once per turn.
-        nightmare_dofus_new_stat_weight = objective_values.get('hp', 0) * level * 0.5 + objective_values.get('pow', 0) * 40 + objective_values.get('permedam', 0) * 4 + objective_values.get('perrandam', 0) * 4
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Nightmare Dofus").id,
-                                nightmare_dofus_new_stat_weight)
-
-        #Sylvan Dofus
-        #For each MP used, the bearer gains 8 Power for 2 turns, stackable 20 times. If the bearer does not use any MP, they are healed for 10% of their HP at the end of their turn.
-        sylvan_dofus_new_stat_weight = objective_values.get('pow', 0) * 50 + objective_values.get('hp', 0) * (4500.0 * 10 / 100) * 0.2 * level / 200
-        self.problem.add_to_of('p',
-                                self.structure.get_item_by_name("Sylvan Dofus 2").id,
-                                sylvan_dofus_new_stat_weight)
+    def add_weird_item_weights_to_objective_funcion(self, objective_values, level):
+        # Valuations of the item effects that aren't stats, see item_valuations.
+        weights = get_special_item_weights(self.special_item_values, objective_values, level)
+        for item_id, weight in weights.items():
+            self.problem.add_to_of('p', item_id, weight)
 
     def write_objective_function(self, objective_values, level):
         self.problem.init_objective_function()
@@ -610,22 +246,409 @@ class Model:
         self.create_stats_points_constraints()
         self.create_light_set_constraints()
         self.create_prysmaradite_constraints()
+        self.create_symmetry_constraints()
         
     def setup(self, model_input):
+        """
+        Sets the constraints and objective up for the input. Only the parts
+        that depend on what changed since the previous setup are redone.
+        """
         self.input = model_input.get_old_input()
+        last_setup = self.last_setup
+        setup = self.get_setup_parts(model_input)
+        # Cleared until the end, so a setup that fails halfway is redone in
+        # full next time.
+        self.last_setup = None
+        
+        def changed(*names):
+            return last_setup is None or any(setup[name] != last_setup[name] for name in names)
 
-        self.modify_level_constraints(model_input.char_level)
-        self.modify_stat_total_constraints(model_input.base_stats_by_attr,
-                                           model_input.options)
-        self.modify_minimum_stat_constraints(model_input.minimum_stats, 
-                                             model_input.char_level)
-        self.modify_locked_equip_constraints(model_input.locked_equips)
-        self.modify_forbidden_items_constraints(model_input.forbidden_equips,
-                                                model_input.options)
-        self.modify_stats_points_constraints(model_input.char_class,
-                                             model_input.stat_points_to_distribute)
+        if changed('char_level'):
+            self.modify_level_constraints(model_input.char_level)
+        if changed('base_stats_by_attr', 'options'):
+            self.modify_stat_total_constraints(model_input.base_stats_by_attr,
+                                               model_input.options)
+        if changed('minimum_stats', 'char_level'):
+            self.modify_minimum_stat_constraints(model_input.minimum_stats, 
+                                                 model_input.char_level)
+        if changed('locked_equips'):
+            self.modify_locked_equip_constraints(model_input.locked_equips)
+        if changed('forbidden_equips', 'options'):
+            self.modify_forbidden_items_constraints(model_input.forbidden_equips,
+                                                    model_input.options)
+        if changed('char_class', 'stat_points_to_distribute'):
+            self.modify_stats_points_constraints(model_input.char_class,
+                                                 model_input.stat_points_to_distribute)
+        
+        if changed('objective_values', 'char_level'):
+            self.write_objective_function(model_input.objective_values, model_input.char_level)
+        if changed('objective_values', 'char_level', 'locked_equips', 'forbidden_equips', 'options'):
+            self.modify_symmetry_constraints()
+        # Reducing looks at the whole input.
+        if changed(*setup):
+            self.problem.set_reduction(self.reduce(model_input))
+            self.tighten_big_m(model_input)
+        self.last_setup = setup
+    
+    def get_setup_parts(self, model_input):
+        parts = {name: copy.deepcopy(getattr(model_input, name)) for name in SETUP_PARTS}
+        parts['tighten_big_m_enabled'] = self.tighten_big_m_enabled
+        return parts
+    
+    def get_setup_distance(self, model_input):
+        """
+        Number of parts of the input that differ from the previous setup,
+        more than all of them when there was none.
+        """
+        if self.last_setup is None:
+            return len(SETUP_PARTS) + 2
+        setup = self.get_setup_parts(model_input)
+        return sum(1 for name in setup if setup[name] != self.last_setup[name])
+    
+    def reduce(self, model_input):
+        """
+        Columns and rows the solver doesn't need for this input: items that
+        can't be equipped or are dominated by others, sets that can't reach a
+        bonus anymore, minimums that aren't set and stats nothing depends on.
+        """
+        reduction = Reduction()
+        problem = self.problem
+        row = problem.get_row_position
+        rhs = problem.get_rhs
+        restrictions = self.restrictions
+        
+        disabled_items = set()
+        for item, x_index in zip(self.items_list, self.item_var_indices):
+            # A locked item that can't be equipped has to stay to make the problem infeasible.
+            if ((rhs(restrictions.level_constraints[item.id]) >= 1
+                 and rhs(restrictions.forbidden_items_constraints[item.id]) >= 1)
+                or rhs(restrictions.locked_equip_constraints[item.id]) < 0):
+                continue
+            disabled_items.add(item.id)
+            self.leave_out_item(reduction, item, x_index)
+        
+        # Lock rows that aren't used only say the items are worn zero times or more.
+        for restriction in restrictions.locked_equip_constraints.values():
+            if rhs(restriction) >= 0:
+                reduction.drop_row(row(restriction))
+        # Symmetry rows that are off only bound an item by its own upper bound.
+        for restriction in restrictions.symmetry_constraints.values():
+            if rhs(restriction) > 0:
+                reduction.drop_row(row(restriction))
+        # So do the first stat point rows, whatever their big-M.
+        for stat_restrictions in restrictions.first_stats_points_constraints.values():
+            for restriction in stat_restrictions.values():
+                reduction.drop_row(row(restriction))
+        
+        minimum_stats = model_input.minimum_stats
+        for stat in self.stats_list:
+            if stat.name not in minimum_stats:
+                reduction.drop_row(row(restrictions.minimum_stat_constraints[stat.name]))
+        adv_mins = minimum_stats.get('adv_mins', {})
+        for stat in self.structure.get_adv_mins():
+            if stat['name'] not in adv_mins:
+                reduction.drop_row(row(restrictions.advanced_minimum_stat_constraints[stat['key']]))
+        
+        dominated_items = self.find_dominated_items(model_input, reduction, disabled_items)
+        for item, x_index in zip(self.items_list, self.item_var_indices):
+            if item.id in dominated_items:
+                disabled_items.add(item.id)
+                self.leave_out_item(reduction, item, x_index)
+                reduction.dominated_items[self.structure.get_type_name_by_id(item.type)] += 1
+        
+        # Set bonuses start at two pieces, and tiers above the number of usable
+        # items can't be on. Set restrictions are stored by name, so sets
+        # sharing a name can't be told apart and are always kept.
+        item_ids = set(item.id for item in self.items_list)
+        set_name_counts = Counter(item_set.name for item_set in self.sets_list)
+        for item_set, set_slot_indices in zip(self.sets_list, self.set_slot_var_indices):
+            if not set_slot_indices or set_name_counts[item_set.name] > 1:
+                continue
+            usable_items = [item_id for item_id in item_set.items
+                            if item_id in item_ids and item_id not in disabled_items]
+            if len(usable_items) >= 2:
+                for slot_number, index in set_slot_indices.items():
+                    if slot_number - 1 > len(usable_items):
+                        reduction.fix_column(index)
+                continue
+            first_row = row(restrictions.first_set_constraints[item_set.name])
+            reduction.drop_column(problem.variable_positions[problem.variable_name('s', item_set.id)],
+                                  first_row)
+            for index in set_slot_indices.values():
+                reduction.drop_column(index)
+            for restriction in (restrictions.first_set_constraints[item_set.name],
+                                restrictions.second_set_constraints[item_set.name],
+                                restrictions.third_set_constraints[item_set.name],
+                                restrictions.fourth_set_constraints[item_set.name]):
+                reduction.drop_row(row(restriction))
+        
+        # A stat with no weight, no maximum and no stat points is only given by
+        # its total row once nothing else uses it.
+        column_rows = problem.get_column_rows()
+        main_stats = set(stat.id for stat in self.main_stats_list)
+        for stat, stat_index in zip(self.stats_list, self.stat_var_indices):
+            if (stat.id in main_stats or stat.name in STAT_MAXIMUM
+                or problem.get_objective_coefficient('stat', stat.id)):
+                continue
+            total_row = row(restrictions.stat_total_constraints[stat.name])
+            if all(r == total_row or r in reduction.rows for r in column_rows[stat_index]):
+                reduction.drop_column(stat_index, total_row)
+                reduction.drop_row(total_row)
+        return reduction
+    
+    def tighten_big_m(self, model_input):
+        """
+        Gives the equip condition rows and the stat point rows the smallest
+        big-M coefficients that are still valid for this input, using the
+        bounds from get_stat_bounds(). With tighten_big_m_enabled off, the
+        constants the rows were built with are put back.
+        """
+        problem = self.problem
+        restrictions = self.restrictions
+        bounds = self.get_stat_bounds(model_input) if self.tighten_big_m_enabled else {}
+        
+        for item in self.items_list:
+            for stat, value in item.min_stats_to_equip:
+                restriction = restrictions.min_condition_contraints[(item.id, stat)]
+                if stat in bounds:
+                    big_m = max(value - bounds[stat][0], 0)
+                else:
+                    big_m = value + MIN_CONDITION_BIG_M
+                problem.set_coefficient(restriction, 'p', item.id, big_m)
+                restriction.changeRHS(big_m - value)
+            for stat, value in item.max_stats_to_equip:
+                restriction = restrictions.max_condition_contraints[(item.id, stat)]
+                if stat in bounds:
+                    big_m = max(bounds[stat][1] - value, 0)
+                else:
+                    big_m = MAX_CONDITION_BIG_M
+                problem.set_coefficient(restriction, 'p', item.id, big_m)
+                restriction.changeRHS(value + big_m)
         
-        self.write_objective_function(model_input.objective_values, model_input.char_level)
+        # The points put in a tier are at most its cap, which is the right hand side.
+        for stat in self.main_stats_list:
+            for i, restriction in restrictions.third_stats_points_constraints[stat.key].items():
+                big_m = -problem.get_rhs(restriction) if self.tighten_big_m_enabled else STAT_POINTS_BIG_M
+                problem.set_coefficient(restriction, 'stat_point_max', 'statpointmax_%d_%d' % (i, stat.id),
+                                        -big_m)
+    
+    def get_stat_bounds(self, model_input):
+        """
+        Lowest and highest total each stat can reach for this input, from the
+        base stats, the items left in the reduction (as many per type as the
+        type has slots), the set bonuses (one set per two slots) and the stat
+        points to distribute.
+        """
+        problem = self.problem
+        restrictions = self.restrictions
+        reduction = problem.reduction
+        rhs = problem.get_rhs
+        
+        lower = {}
+        upper = {}
+        for stat in self.stats_list:
+            base = -rhs(restrictions.stat_total_constraints[stat.name])
+            lower[stat.id] = base
+            upper[stat.id] = base
+        
+        values_by_type = {}
+        for item, x_index in zip(self.items_list, self.item_var_indices):
+            if x_index in reduction.columns:
+                continue
+            type_values = values_by_type.setdefault(self.structure.get_type_name_by_id(item.type), {})
+            stat_values = Counter()
+            for stat_id, value in item.stats:
+                stat_values[stat_id] += value
+            for stat_id, value in stat_values.items():
+                type_values.setdefault(stat_id, []).extend([value] * problem.variables_list[x_index].upBound)
+        total_slots = 0
+        for type_name, type_values in values_by_type.items():
+            slots = int(rhs(restrictions.type_constraints[type_name]))
+            total_slots += slots
+            for stat_id, values in type_values.items():
+                if stat_id in lower:
+                    values.sort()
+                    lower[stat_id] += sum(value for value in values[:slots] if value < 0)
+                    upper[stat_id] += sum(value for value in values[len(values) - slots:] if value > 0)
+        
+        lowest_bonuses = {}
+        highest_bonuses = {}
+        for item_set, set_slot_indices in zip(self.sets_list, self.set_slot_var_indices):
+            set_lowest = {}
+            set_highest = {}
+            for num_items, stat_id, value in item_set.bonus:
+                index = set_slot_indices.get(num_items + 1)
+                if index is None or index in reduction.columns:
+                    continue
+                set_lowest[stat_id] = min(set_lowest.get(stat_id, 0), value)
+                set_highest[stat_id] = max(set_highest.get(stat_id, 0), value)
+            for stat_id, value in set_lowest.items():
+                lowest_bonuses.setdefault(stat_id, []).append(value)
+            for stat_id, value in set_highest.items():
+                highest_bonuses.setdefault(stat_id, []).append(value)
+        max_sets = total_slots // 2
+        for stat_id, values in lowest_bonuses.items():
+            if stat_id in lower:
+                lower[stat_id] += sum(sorted(values)[:max_sets])
+        for stat_id, values in highest_bonuses.items():
+            if stat_id in upper:
+                upper[stat_id] += sum(sorted(values)[len(values) - max_sets:])
+        
+        points_restriction = restrictions.fourth_stats_points_constraint
+        for j, stat in enumerate(self.main_stats_list):
+            point_vars = [problem.variables_list[index] for index in self.stat_point_var_indices[6 * j:6 * j + 6]]
+            cheapest = min(points_restriction[var] for var in point_vars)
+            upper[stat.id] += max(rhs(points_restriction), 0) / cheapest
+        
+        bounds = {}
+        for stat, stat_index in zip(self.stats_list, self.stat_var_indices):
+            var = problem.variables_list[stat_index]
+            low = lower[stat.id] if var.lowBound is None else max(lower[stat.id], var.lowBound)
+            high = upper[stat.id] if var.upBound is None else min(upper[stat.id], var.upBound)
+            bounds[stat.id] = (low, high)
+        return bounds
+    
+    def get_item_rows(self, item):
+        restrictions = self.restrictions
+        item_restrictions = [restrictions.level_constraints[item.id],
+                             restrictions.forbidden_items_constraints[item.id],
+                             restrictions.first_presence_constraints[item.id],
+                             restrictions.second_presence_constraints[item.id],
+                             restrictions.locked_equip_constraints[item.id]]
+        for stat, _ in item.min_stats_to_equip:
+            item_restrictions.append(restrictions.min_condition_contraints[(item.id, stat)])
+        for stat, _ in item.max_stats_to_equip:
+            item_restrictions.append(restrictions.max_condition_contraints[(item.id, stat)])
+        for key in self.symmetry_keys_by_item.get(item.id, []):
+            item_restrictions.append(restrictions.symmetry_constraints[key])
+        return [self.problem.get_row_position(restriction) for restriction in item_restrictions]
+    
+    def leave_out_item(self, reduction, item, x_index):
+        reduction.fix_column(x_index)
+        reduction.fix_column(self.problem.variable_positions[self.problem.variable_name('p', item.id)])
+        for r in self.get_item_rows(item):
+            reduction.drop_row(r)
+    
+    def get_stat_directions(self, reduction):
+        """
+        Whether raising or lowering each stat, all else equal, keeps every
+        solution feasible and doesn't lower the objective.
+        """
+        problem = self.problem
+        constraints = problem.constraints()
+        column_rows = problem.get_column_rows()
+        directions = {}
+        for stat, stat_index in zip(self.stats_list, self.stat_var_indices):
+            var = problem.variables_list[stat_index]
+            weight = problem.get_objective_coefficient('stat', stat.id)
+            can_raise = weight >= 0 and var.upBound is None
+            can_lower = weight <= 0 and var.lowBound is None
+            total_row = problem.get_row_position(self.restrictions.stat_total_constraints[stat.name])
+            for r in column_rows[stat_index]:
+                if r == total_row or r in reduction.rows:
+                    continue
+                constraint = constraints[r]
+                coef = constraint[var]
+                if constraint.sense == pulp.LpConstraintEQ:
+                    can_raise = can_lower = False
+                elif coef * constraint.sense < 0:
+                    can_raise = False
+                elif coef * constraint.sense > 0:
+                    can_lower = False
+            directions[stat.id] = (can_raise, can_lower)
+        return directions
+    
+    def find_dominated_items(self, model_input, reduction, disabled_items):
+        """
+        Items that some optimal solution doesn't use: an item is dominated by
+        another of the same type that is at least as good on every stat the
+        objective and constraints care about, has the same set and special
+        rows, and has no stricter conditions. It can be left out once it is
+        dominated by as many items as its type has slots.
+        """
+        problem = self.problem
+        restrictions = self.restrictions
+        constraints = problem.constraints()
+        column_rows = problem.get_column_rows()
+        directions = self.get_stat_directions(reduction)
+        total_rows = set(problem.get_row_position(restriction)
+                         for restriction in restrictions.stat_total_constraints.values())
+        
+        items_by_type = {}
+        for item, x_index in zip(self.items_list, self.item_var_indices):
+            if item.id not in disabled_items:
+                items_by_type.setdefault(self.structure.get_type_name_by_id(item.type), []).append((item, x_index))
+        
+        dominated_items = set()
+        for type_name, type_items in items_by_type.items():
+            capacity = problem.get_rhs(restrictions.type_constraints[type_name])
+            own_rows = set([problem.get_row_position(restrictions.type_constraints[type_name])])
+            candidate_ids = set(item.id for item in
+                                self.structure.get_unique_items_by_type_and_level(type_name, model_input.char_level))
+            
+            groups = {}
+            for item, x_index in type_items:
+                p_index = problem.variable_positions[problem.variable_name('p', item.id)]
+                item_rows = own_rows.union(self.get_item_rows(item))
+                
+                # Everything that has to be equal goes in the group key.
+                key = [problem.variables_list[x_index].upBound]
+                for index in (x_index, p_index):
+                    var = problem.variables_list[index]
+                    for r in column_rows[index]:
+                        if r not in item_rows and r not in total_rows and r not in reduction.rows:
+                            key.append((r, constraints[r][var]))
+                
+                # Everything else is compared as higher is better.
+                features = {'x': problem.get_objective_coefficient('x', item.id),
+                            'p': problem.get_objective_coefficient('p', item.id)}
+                stat_values = Counter()
+                for stat_id, value in item.stats:
+                    stat_values[stat_id] += value
+                for stat_id, value in stat_values.items():
+                    can_raise, can_lower = directions.get(stat_id, (True, True))
+                    if can_raise and can_lower:
+                        continue
+                    elif can_raise:
+                        features[stat_id] = value
+                    elif can_lower:
+                        features[stat_id] = -value
+                    elif value:
+                        key.append(('stat', stat_id, value))
+                for stat_id, value in item.min_stats_to_equip:
+                    features[('min', stat_id)] = -value
+                for stat_id, value in item.max_stats_to_equip:
+                    features[('max', stat_id)] = value
+                
+                is_locked = problem.get_rhs(restrictions.locked_equip_constraints[item.id]) < 0
+                groups.setdefault(tuple(sorted(key, key=repr)), []).append((item, features, is_locked))
+            
+            for members in groups.values():
+                if len(members) <= capacity:
+                    continue
+                names = set()
+                for _, features, _ in members:
+                    names.update(features)
+                # A missing stat is zero, a missing condition is the loosest one.
+                defaults = [float('inf') if isinstance(name, tuple) else 0 for name in names]
+                vectors = [[features.get(name, default) for name, default in zip(names, defaults)]
+                           for _, features, _ in members]
+                candidates = [(item.id, vector) for (item, _, _), vector in zip(members, vectors)
+                              if item.id in candidate_ids]
+                for (item, _, is_locked), vector in zip(members, vectors):
+                    if is_locked:
+                        continue
+                    dominating = 0
+                    for other_id, other_vector in candidates:
+                        # Ties are broken by id so that two equal items don't rule each other out.
+                        if (other_id != item.id
+                            and all(a >= b for a, b in zip(other_vector, vector))
+                            and (other_vector != vector or other_id < item.id)):
+                            dominating += 1
+                            if dominating >= capacity:
+                                dominated_items.add(item.id)
+                                break
+        return dominated_items
     
     def create_type_constraints(self):
         types_list = self.structure.get_types_list()
@@ -672,6 +695,25 @@ class Model:
         for item in self.items_list:
             restriction = self.problem.restriction_lt_eq(0, [(1, 'p', item.id)])  
             self.restrictions.forbidden_items_constraints[item.id] = restriction
+        self.create_forbidden_item_masks()
+    
+    def create_forbidden_item_masks(self):
+        """
+        Bit masks of the items each forbid and option rules out, where bit i
+        is the i-th item of items_list. Forbidding one variant of an OR item
+        forbids them all.
+        """
+        self.forbidden_item_masks = {item.id: 1 << i for i, item in enumerate(self.items_list)}
+        for or_item_items in self.structure.get_available_or_items().values():
+            group_mask = 0
+            for item in or_item_items:
+                group_mask |= self.forbidden_item_masks.get(item.id, 0)
+            for item in or_item_items:
+                self.forbidden_item_masks[item.id] = group_mask
+        self.forbidden_option_masks = {option: sum(1 << i for i in positions) for option, positions
+                                       in get_option_item_positions(self.structure, self.items_list).items()}
+        # The rows start out with every item forbidden.
+        self.forbidden_mask = (1 << len(self.items_list)) - 1
     
     def create_stats_points_constraints(self):
         for stat in self.main_stats_list:
@@ -687,7 +729,8 @@ class Model:
                 self.restrictions.second_stats_points_constraints[stat.key][i] = restriction
             for i in range(0, 5):
                 restriction = self.problem.restriction_lt_eq(0, [(-1, 'stat_point', 'statpoint_%d_%d' % (i, stat.id)),
-                                                              (-2000, 'stat_point_max', 'statpointmax_%d_%d' % (i, stat.id))]) 
+                                                              (-STAT_POINTS_BIG_M, 'stat_point_max', 'statpointmax_%d_%d' % (i, stat.id))]) 
+                self.problem.make_adjustable(restriction, 'stat_point_max', 'statpointmax_%d_%d' % (i, stat.id))
                 self.restrictions.third_stats_points_constraints[stat.key][i] = restriction 
         matrix = []
         for stat in self.main_stats_list:
@@ -724,41 +767,20 @@ class Model:
         restriction.changeRHS(stat_points)    
     
     def modify_forbidden_items_constraints(self, forbidden_equips, options):
-        new_forbid_list = forbidden_equips
+        mask = 0
+        for item_id in forbidden_equips:
+            mask |= self.forbidden_item_masks.get(item_id, 0)
+        for option in get_forbidding_options(options):
+            mask |= self.forbidden_option_masks[option]
         
-        or_items = self.structure.get_available_or_items()
-        for _, or_item_items in or_items.items():
-            for item in or_item_items:
-                if item.id in forbidden_equips:
-                    for or_item in or_item_items:
-                        new_forbid_list.add(or_item.id)
-
-        for item in self.items_list:
-            restriction = self.restrictions.forbidden_items_constraints.get(item.id, None)
-            if ((item.id in new_forbid_list) 
-                #or (options['shields'] == False and item.type == self.structure.get_type_id_by_name('Shield'))
-                or (options['dofus'] == 'lightset' 
-                    and item.type == self.structure.get_type_id_by_name('Dofus')
-                    and item.weird_conditions['light_set']) 
-                or (options['dofus'] == False 
-                    and item.type == self.structure.get_type_id_by_name('Dofus'))
-                or (options['dofus'] == 'cawwot' 
-                    and item.type == self.structure.get_type_id_by_name('Dofus'))
-                    and item.id != self.structure.get_item_by_name('Cawwot Dofus').id
-                or ((not options['dragoturkey'])
-                    and item.type == self.structure.get_type_id_by_name('Pet'))
-                    and 'Dragoturkey' in item.name
-                or ((not options['seemyool'])
-                    and item.type == self.structure.get_type_id_by_name('Pet'))
-                    and 'Seemyool' in item.name
-                or ((not options['rhineetle'])
-                    and item.type == self.structure.get_type_id_by_name('Pet'))
-                    and 'Rhineetle' in item.name
-                or ((not options['prysmaradite'])
-                    and item.weird_conditions['prysmaradite'])):
-                restriction.changeRHS(0)
-            else:
-                restriction.changeRHS(1)
+        # Only the rows of the items whose bit changed are touched.
+        changed = mask ^ self.forbidden_mask
+        while changed:
+            bit = changed & -changed
+            item = self.items_list[bit.bit_length() - 1]
+            self.restrictions.forbidden_items_constraints[item.id].changeRHS(0 if mask & bit else 1)
+            changed ^= bit
+        self.forbidden_mask = mask
         #gelano1 = self.structure.get_item_by_name('Gelano (#1)')
         #gelano2 = self.structure.get_item_by_name('Gelano (#2)')
         #restriction = self.restrictions.forbidden_items_constraints.get(gelano2.id, None)
@@ -774,8 +796,10 @@ class Model:
             self.restrictions.locked_equip_constraints[item.id] = restriction
         or_items = self.structure.get_available_or_items()
         for item_name in or_items:
-            restriction2 = self.problem.restriction_lt_eq(-1, [(-1, 'x', item.id) for item in or_items[item_name]])
-            self.restrictions.locked_equip_constraints[item_name] = restriction2
+            band_items = [item for item in or_items[item_name] if self.is_in_level_band(item)]
+            if band_items:
+                restriction2 = self.problem.restriction_lt_eq(-1, [(-1, 'x', item.id) for item in band_items])
+                self.restrictions.locked_equip_constraints[item_name] = restriction2
 
     def modify_locked_equip_constraints(self, locked_equips):
         locked_equip_values = []
@@ -799,40 +823,33 @@ class Model:
             restriction = self.restrictions.locked_equip_constraints[item.id]
             restriction.changeRHS(-locked_dic[item.id] if item.id in locked_equip_values else 0)
         for item_name in or_items:
-            restriction = self.restrictions.locked_equip_constraints[item_name]
+            restriction = self.restrictions.locked_equip_constraints.get(item_name)
+            if restriction is None:
+                continue
             restriction.changeRHS(-locked_dic_names[item_name] if item_name in list(locked_equips.values()) else 0)
             
     def create_set_constraints(self):
-        for item_set in self.sets_list:
-            
-            valid_items_in_set = []
-            s = get_structure()
-            for item in item_set.items:
-                if not s.get_item_by_id(item).removed:
-                    valid_items_in_set.append(item)
-            restriction = self.problem.restriction_eq(0, [(1, 'x', item) for item in valid_items_in_set]
+        # The number of pieces s lies in the range of the one tier that is on.
+        for item_set, tiers in zip(self.sets_list, self.set_tiers):
+            if not tiers:
+                continue
+            restriction = self.problem.restriction_eq(0, [(1, 'x', item) for item in self.get_valid_items_in_set(item_set)]
                                                             + [(-1, 's', item_set.id)])
             self.restrictions.first_set_constraints[item_set.name] = restriction
-        
-        for item_set in self.sets_list:
-            restrictions_list = []
-            for slot in range (1, 9):
-                restriction = self.problem.restriction_lt_eq(0, [(slot, 'ss', '%d_%d' % (item_set.id, slot + 1)), (-1, 's', item_set.id)])   
-                restrictions_list.append(restriction)
-            self.restrictions.second_presence_constraints[item_set.name] = restrictions_list
-
-        for item_set in self.sets_list:
-            restriction = self.problem.restriction_eq(1, [(1, 'ss', '%d_%d' % (item_set.id, slot + 1)) for slot in range (0, 9)]) 
+            
+            restriction = self.problem.restriction_lt_eq(0, [(fewest, 'ss', '%d_%d' % (item_set.id, fewest + 1))
+                                                             for fewest, _ in tiers if fewest > 0]
+                                                            + [(-1, 's', item_set.id)])
+            self.restrictions.second_set_constraints[item_set.name] = restriction
+            
+            restriction = self.problem.restriction_eq(1, [(1, 'ss', '%d_%d' % (item_set.id, fewest + 1))
+                                                          for fewest, _ in tiers])
             self.restrictions.third_set_constraints[item_set.name] = restriction
-        
-        for item_set in self.sets_list:
-            restrictions_list = []
-            for slot in range (0, 9):
-                restriction = self.problem.restriction_lt_eq(8 + slot,
-                                                             [(8, 'ss', '%d_%d' % (item_set.id, slot + 1)),
-                                                              (1, 's', item_set.id)])
-                restrictions_list.append(restriction)
-            self.restrictions.fourth_set_constraints[item_set.name] = restrictions_list
+            
+            restriction = self.problem.restriction_lt_eq(0, [(-most, 'ss', '%d_%d' % (item_set.id, fewest + 1))
+                                                             for fewest, most in tiers]
+                                                            + [(1, 's', item_set.id)])
+            self.restrictions.fourth_set_constraints[item_set.name] = restriction
     
     def create_light_set_constraints(self):
         """
@@ -842,10 +859,10 @@ class Model:
         - If there is no weird_condition 'light_set' present, there can be at most 6 trophies
         """
         N_TOTAL_SETS = len(self.sets_list)
-        # Count 1 for each bonus 2 for all item sets tested
-        matrix = [(1, 'ss', '%d_%d' % (item_set.id, 2 + 1)) for item_set in self.sets_list]
-        # Count 2 for each bonus 3 for all item sets tested
-        matrix += [(2, 'ss', '%d_%d' % (item_set.id, 3 + 1)) for item_set in self.sets_list]
+        # Count 1 for each bonus 2 and 2 for each bonus 3 for all item sets tested
+        matrix = [((1 if fewest == 2 else 2), 'ss', '%d_%d' % (item_set.id, fewest + 1))
+                  for item_set, tiers in zip(self.sets_list, self.set_tiers)
+                  for fewest, _ in tiers if fewest in (2, 3)]
         matrix.append((-N_TOTAL_SETS, 'ytrophy', 1))  
         # restriction to 2 (either 1 bonus 3 or 2 bonus 2)
         restriction = self.problem.restriction_lt_eq(2, matrix) 
@@ -855,10 +872,10 @@ class Model:
                                                                               (1, 'trophies', 1)]) 
         self.restrictions.second_light_set_constraint = restriction
         
-        plist = []
         # Limits the number of bonus 4 or more to 0
-        for set_bonus in range(4, 9): 
-            plist.extend([(1, 'ss', '%d_%d' % (item_set.id, set_bonus + 1)) for item_set in self.sets_list])
+        plist = [(1, 'ss', '%d_%d' % (item_set.id, fewest + 1))
+                 for item_set, tiers in zip(self.sets_list, self.set_tiers)
+                 for fewest, _ in tiers if fewest >= 4]
         plist.append((-N_TOTAL_SETS, 'ytrophy', 2))
         restriction = self.problem.restriction_lt_eq(0, plist)
         self.restrictions.third_light_set_constraint = restriction
@@ -891,34 +908,51 @@ class Model:
     def create_condition_contraints(self):
         for item in self.items_list:
             for stat, value in item.min_stats_to_equip:
-                restriction = self.problem.restriction_lt_eq(10000,
-                                                            [(value + 10000, 'p', item.id),
+                restriction = self.problem.restriction_lt_eq(MIN_CONDITION_BIG_M,
+                                                            [(value + MIN_CONDITION_BIG_M, 'p', item.id),
                                                              (-1, 'stat', stat)])
+                self.problem.make_adjustable(restriction, 'p', item.id)
                 self.restrictions.min_condition_contraints[(item.id, stat)] = restriction 
             
         for item in self.items_list:
             for stat, value in item.max_stats_to_equip:
-                restriction = self.problem.restriction_lt_eq(100000 + value,
-                                                             [(100000, 'p', item.id),
+                restriction = self.problem.restriction_lt_eq(MAX_CONDITION_BIG_M + value,
+                                                             [(MAX_CONDITION_BIG_M, 'p', item.id),
                                                               (1, 'stat', stat)])
-                
+                self.problem.make_adjustable(restriction, 'p', item.id)
                 self.restrictions.max_condition_contraints[(item.id, stat)] = restriction                     
 
     def create_stat_total_constraints(self):
+        # All rows are filled in one pass over the sparse item x stat and
+        # set x bonus arrays of the structure.
+        rows = {}
+        for stat, stat_var_index in zip(self.stats_list, self.stat_var_indices):
+            rows[stat.id] = [(-1, stat_var_index)]
+        
+        # Positions are in the structure's items list, which has the items
+        # above the level band too.
+        positions, stat_ids, values = self.structure.get_item_stat_arrays()
+        x_indices = dict(zip((item.id for item in self.items_list), self.item_var_indices))
+        item_var_indices = [x_indices.get(item.id) for item in self.structure.get_available_items_list()]
+        for position, stat_id, value in zip(positions, stat_ids, values):
+            row = rows.get(stat_id)
+            if row is not None and item_var_indices[position] is not None:
+                row.append((value, item_var_indices[position]))
+        
+        positions, num_items_list, stat_ids, values = self.structure.get_set_bonus_arrays()
+        set_slot_var_indices = self.set_slot_var_indices
+        for position, num_items, stat_id, value in zip(positions, num_items_list, stat_ids, values):
+            row = rows.get(stat_id)
+            # Sets without enough valid items for a bonus have no tier for it.
+            set_slot_index = set_slot_var_indices[position].get(num_items + 1)
+            if row is not None and set_slot_index is not None:
+                row.append((value, set_slot_index))
+        
+        for j, stat in enumerate(self.main_stats_list):
+            rows[stat.id].extend((1, index) for index in self.stat_point_var_indices[6 * j:6 * j + 6])
+        
         for stat in self.stats_list:
-            matrix = [(-1, 'stat', stat.id)]
-            for item in self.items_list:
-                for stat_id, value in item.stats:
-                    if stat_id == stat.id:
-                        matrix.append((value, 'x', item.id))
-            for item_set in self.sets_list:
-                for num_items, stat_id, value in item_set.bonus:
-                    if stat_id == stat.id:
-                        matrix.append((value, 'ss', '%d_%d' % (item_set.id, num_items + 1)))
-            if stat in self.main_stats_list:
-                for i in range(0, 6):
-                    matrix.append((1, 'stat_point', 'statpoint_%d_%d' % (i, stat.id)))
-            restriction = self.problem.restriction_eq(0, matrix)
+            restriction = self.problem.restriction_eq_by_position(0, rows[stat.id])
             self.restrictions.stat_total_constraints[stat.name] = restriction
 
     def modify_stat_total_constraints(self, base_stats_by_attr, options):
@@ -982,101 +1016,257 @@ class Model:
             restriction = self.problem.restriction_lt_eq(-10000, matrix)   
             self.restrictions.advanced_minimum_stat_constraints[stat['key']] = restriction
 
+    def create_symmetry_constraints(self):
+        """
+        Items whose columns are the same in every row but their own are
+        interchangeable, so each one is only worn when the previous one of
+        its group is: x of an item <= x of the previous one.
+        """
+        problem = self.problem
+        constraints = problem.constraints()
+        column_rows = problem.get_column_rows()
+        self.symmetry_keys_by_item = {}
+        groups = {}
+        for item, x_index in zip(self.items_list, self.item_var_indices):
+            p_index = problem.variable_positions[problem.variable_name('p', item.id)]
+            item_rows = set(self.get_item_rows(item))
+            key = [problem.variables_list[x_index].upBound, item.level,
+                   tuple(sorted(item.min_stats_to_equip)), tuple(sorted(item.max_stats_to_equip))]
+            for index in (x_index, p_index):
+                var = problem.variables_list[index]
+                for r in column_rows[index]:
+                    if r not in item_rows:
+                        key.append((index == x_index, r, constraints[r][var]))
+            groups.setdefault(tuple(sorted(key, key=repr)), []).append(item)
+        
+        for items in groups.values():
+            items.sort(key=lambda item: item.id)
+            for previous, item in zip(items, items[1:]):
+                restriction = self.problem.restriction_lt_eq(0, [(1, 'x', item.id), (-1, 'x', previous.id)])
+                self.restrictions.symmetry_constraints[(previous.id, item.id)] = restriction
+                self.symmetry_keys_by_item.setdefault(previous.id, []).append((previous.id, item.id))
+                self.symmetry_keys_by_item.setdefault(item.id, []).append((previous.id, item.id))
+    
+    def modify_symmetry_constraints(self):
+        # The objective, locks and forbidden items can still tell two items
+        # apart, and then the row only bounds x by its upper bound.
+        problem = self.problem
+        restrictions = self.restrictions
+        
+        def signature(item_id):
+            return (problem.get_objective_coefficient('x', item_id),
+                    problem.get_objective_coefficient('p', item_id),
+                    problem.get_rhs(restrictions.forbidden_items_constraints[item_id]) >= 1,
+                    problem.get_rhs(restrictions.locked_equip_constraints[item_id]) >= 0)
+        
+        for (previous_id, item_id), restriction in restrictions.symmetry_constraints.items():
+            if signature(previous_id) == signature(item_id) and signature(item_id)[3]:
+                restriction.changeRHS(0)
+            else:
+                restriction.changeRHS(problem.variables_list[
+                    problem.variable_positions[problem.variable_name('x', item_id)]].upBound)
+    
     def modify_minimum_stat_constraints(self, minimum_stats, level):
         for stat in self.stats_list:
             if stat.name == 'HP':
                 restriction = self.restrictions.minimum_stat_constraints[stat.name]
-                restriction.changeRHS(-minimum_stats.get(stat.name, -10000) + 55 + 5*(level-1))
+                restriction.changeRHS(-minimum_stats.get(stat.name, NO_MINIMUM_STAT) + 55 + 5*(level-1))
             else:
                 restriction = self.restrictions.minimum_stat_constraints[stat.name]
-                restriction.changeRHS(-minimum_stats.get(stat.name, -10000))
+                restriction.changeRHS(-minimum_stats.get(stat.name, NO_MINIMUM_STAT))
         self.modify_advanced_minimum_stat_constraints(minimum_stats.get('adv_mins', {}))
     
     def modify_advanced_minimum_stat_constraints(self, minimum_stats):
         adv_min_stats = self.structure.get_adv_mins()
         for stat in adv_min_stats:
             restriction = self.restrictions.advanced_minimum_stat_constraints[stat['key']]
-            restriction.changeRHS(-minimum_stats.get(stat['name'], -10000))
+            restriction.changeRHS(-minimum_stats.get(stat['name'], NO_MINIMUM_STAT))
     
-    def run(self, retries=0, change_of=False):
-        if change_of:
-            self.input['objective_values']['vit'] += 1
-            self.write_objective_function(self.input['objective_values'], self.input['char_level'])
+    def run(self, retries=0, backend=None, initial_solution=None, policy=None, handle=None):
+        """
+        Solves with the given (or configured) backend. When it fails, up to
+        retries other backends are tried in turn on the same problem.
+        """
+        initial_values = self.get_initial_values(initial_solution)
+        if policy is not None and policy.lazy_conditions:
+            if self.run_lazy_conditions(retries, backend, initial_values, policy, handle):
+                return
+            print('Lazy conditions did not settle, solving the full model')
+        self.run_backends(retries, backend, initial_values, policy, handle)
+    
+    def run_backends(self, retries, backend, initial_values, policy, handle):
+        backend_names = get_fallback_backend_names(backend)[:retries + 1]
+        for i, backend_name in enumerate(backend_names):
+            try:
+                self.problem.run(backend_name, initial_values, policy, handle)
+                return
+            except pulp.PulpSolverError as e:
+                if i == len(backend_names) - 1:
+                    raise
+                print('Solver backend %s failed (%s), falling back to %s'
+                      % (backend_name, e, backend_names[i + 1]))
+
+    def run_lazy_conditions(self, retries, backend, initial_values, policy, handle):
+        """
+        Solves without the equip condition rows, then adds back the rows of
+        the conditions the solution breaks and solves again, starting from
+        that solution without the items concerned, until none is broken.
+        Returns False when that doesn't settle in MAX_LAZY_ROUNDS solves.
+        Backends that keep every row (in_process, highs) settle at once.
+        """
+        reduction = self.problem.reduction
+        row = self.problem.get_row_position
+        lazy_rows = {}
+        for key, restriction in itertools.chain(self.restrictions.min_condition_contraints.items(),
+                                                self.restrictions.max_condition_contraints.items()):
+            if row(restriction) not in reduction.rows:
+                lazy_rows[key] = row(restriction)
+                reduction.drop_row(row(restriction))
         try:
-            self.problem.run()
-        except pulp.PulpSolverError:
-            if retries > 0:            
-                self.run(retries-1, True)
-            else:
-                raise
+            for round_number in range(1, MAX_LAZY_ROUNDS + 1):
+                self.run_backends(retries, backend, initial_values, policy, handle)
+                status = self.problem.get_status()
+                if status != 'Optimal':
+                    # Without conditions is less constrained, so infeasible stays infeasible.
+                    return status == 'Infeasible'
+                broken = self.get_broken_conditions(lazy_rows)
+                if not broken:
+                    return True
+                print('Lazy conditions: %d broken after solve %d' % (len(broken), round_number))
+                for key in broken:
+                    reduction.keep_row(lazy_rows.pop(key))
+                item_counts = Counter(self.get_item_id_list())
+                for item_id, _ in broken:
+                    item_counts.pop(item_id, None)
+                initial_values = self.get_item_initial_values(item_counts)
+            return False
+        finally:
+            for r in lazy_rows.values():
+                reduction.keep_row(r)
+    
+    def get_broken_conditions(self, conditions):
+        """
+        Keys of the given equip conditions that the items of the current
+        solution don't meet, checked like ModelResult does.
+        """
+        stat_totals = {stat.id: int(round(v)) for stat, v
+                       in zip(self.stats_list, self.problem.get_values(self.stat_var_indices))}
+        broken = []
+        for item_id in set(self.get_item_id_list()):
+            item = self.structure.get_item_by_id(item_id)
+            for stat, value in item.min_stats_to_equip:
+                if (item_id, stat) in conditions and stat_totals[stat] < value:
+                    broken.append((item_id, stat))
+            for stat, value in item.max_stats_to_equip:
+                if (item_id, stat) in conditions and stat_totals[stat] > value:
+                    broken.append((item_id, stat))
+        return broken
+    
+    def get_initial_values(self, minimal_solution):
+        """
+        Values of the item, set and trophy variables for the items of a
+        previous ModelResultMinimal, to be used as a MIP start. Returns None
+        when those items can't all be equipped with the current input.
+        """
+        if minimal_solution is None:
+            return None
+        return self.get_item_initial_values(Counter(item_id for item_id in minimal_solution.item_per_slot.values()
+                                                    if isinstance(item_id, int)))
+    
+    def get_item_initial_values(self, item_counts):
+        if not item_counts:
+            return None
+        
+        # Interchangeable items are worn in the order of their symmetry rows.
+        swapped = True
+        while swapped:
+            swapped = False
+            for (previous_id, item_id), restriction in self.restrictions.symmetry_constraints.items():
+                if (self.problem.get_rhs(restriction) == 0
+                    and item_counts.get(item_id, 0) > item_counts.get(previous_id, 0)):
+                    item_counts[previous_id], item_counts[item_id] = item_counts[item_id], item_counts.get(previous_id, 0)
+                    swapped = True
+
+        initial_values = {}
+        has_trophies = False
+        for item in self.items_list:
+            count = item_counts.pop(item.id, 0)
+            if count > 0:
+                max_number = 2 if self.structure.get_type_name_by_id(item.type) == 'Ring' and item.set == None else 1
+                level_rhs = self.problem.get_rhs(self.restrictions.level_constraints[item.id])
+                forbidden_rhs = self.problem.get_rhs(self.restrictions.forbidden_items_constraints[item.id])
+                if count > max_number or level_rhs < 1 or forbidden_rhs < 1:
+                    return None
+                has_trophies = has_trophies or item.weird_conditions['light_set']
+            initial_values[self.problem.variable_name('x', item.id)] = count
+            initial_values[self.problem.variable_name('p', item.id)] = 1 if count > 0 else 0
+        if item_counts:
+            # Some items are not in the model anymore.
+            return None
+
+        for item_set, tiers in zip(self.sets_list, self.set_tiers):
+            if not tiers:
+                continue
+            pieces = sum(initial_values.get(self.problem.variable_name('x', item_id), 0)
+                         for item_id in item_set.items)
+            if pieces > tiers[-1][1]:
+                return None
+            initial_values[self.problem.variable_name('s', item_set.id)] = pieces
+            for fewest, most in tiers:
+                initial_values[self.problem.variable_name('ss', '%d_%d' % (item_set.id, fewest + 1))] = \
+                    1 if fewest <= pieces <= most else 0
+
+        initial_values[self.problem.variable_name('trophies', 1)] = 1 if has_trophies else 0
+        initial_values[self.problem.variable_name('ytrophy', 1)] = 0 if has_trophies else 1
+        initial_values[self.problem.variable_name('ytrophy', 2)] = 0 if has_trophies else 1
+        return initial_values
                 
     def get_result_string(self):
         if self.problem.get_status() == 'Infeasible':
             return 'Infeasible'
         
         result = ''
-        
-        lp_vars = self.problem.get_result()
-        grouped_vars = {}
-        for k, v in lp_vars.items():
-            prefix, suffix = k.split('_', 1)
-            group = grouped_vars.setdefault(prefix, {})
-            group[suffix] = v
-                
-        result += ', '.join(grouped_vars) + '\n\n'
+        result += ', '.join(self.problem.categories) + '\n\n'
         
         result += 'Sets:\n'
-        for k, v in grouped_vars['ss'].items():
-            if v > 0:
-                set_id, number_of_pieces = k.rsplit('_', 1)
-                set_id = int(set_id)
-                number_of_pieces = int(number_of_pieces) - 1
-                if number_of_pieces > 1:
-                    result += ('%s (%d pieces)\n' % (self.structure.get_set_by_id(set_id).name, number_of_pieces))
+        item_counts = Counter(self.get_item_id_list())
+        for item_set in self.sets_list:
+            number_of_pieces = sum(item_counts[item_id] for item_id in item_set.items)
+            if number_of_pieces > 1:
+                result += ('%s (%d pieces)\n' % (item_set.name, number_of_pieces))
         result += '\nStats:\n'
-        for stat in self.stats_list:
-            result += '%s: %d\n' % (stat.name, grouped_vars['stat'][str(stat.id)])
+        for stat, v in zip(self.stats_list, self.problem.get_values(self.stat_var_indices)):
+            result += '%s: %d\n' % (stat.name, v)
 
         result += '\nGear:\n'
-        for k, v in grouped_vars['x'].items():
-            for _ in range(int(v)):
-                result += self.structure.get_item_by_id(int(k)).name + '\n'
+        for item_id in self.get_item_id_list():
+            result += self.structure.get_item_by_id(item_id).name + '\n'
         return result
         
+    def get_item_id_list(self):
+        item_id_list = []
+        for item, v in zip(self.items_list, self.problem.get_values(self.item_var_indices)):
+            for _ in range(int(round(v))):
+                item_id_list.append(item.id)
+        return item_id_list
+        
     def get_stats(self):
-        lp_vars = self.problem.get_result()
+        stat_point_values = self.problem.get_values(self.stat_point_var_indices)
         
         stats = {}
-        for stat in self.main_stats_list: 
-            stats[stat.key] = 0
-            for i in range(0,6):
-                sanitized_id = str(stat.id).replace(' ', '_').replace('-', '_')
-                stats[stat.key] += int(lp_vars['stat_point_statpoint_%d_%s' % (i, sanitized_id)])
-                #print '%s: tier %d - %d' % (stat.name, i, lp_vars['stat_point_statpoint_%d_%s' % (i, sanitized_id)])
-                #if i < 5:                
-                #    print 'y %s: tier %d - %d' % (stat.name, i, lp_vars['stat_point_max_statpointmax_%d_%s' % (i, sanitized_id)])
+        for j, stat in enumerate(self.main_stats_list): 
+            stats[stat.key] = sum(int(round(v)) for v in stat_point_values[6 * j:6 * j + 6])
         return stats
         
     def get_result_minimal(self):
-        item_id_list = []
-   
-        lp_vars = self.problem.get_result()
-        grouped_vars = {}
-        for k, v in lp_vars.items():
-            prefix, suffix = k.split('_', 1)
-            group = grouped_vars.setdefault(prefix, {})
-            group[suffix] = v
-        
-        for k, v in grouped_vars['x'].items():
-            for _ in range(int(v)):
-                item = int(k)
-                item_id_list.append(item)
-                
-        result = ModelResultMinimal.from_item_id_list(item_id_list, self.input, self.get_stats())
-        return result
+        return ModelResultMinimal.from_item_id_list(self.get_item_id_list(), self.input, self.get_stats())
+
+    def reset_solution(self):
+        self.problem.reset_solution()
 
     def get_solved_status(self):
-        return self.problem.get_status()
+        return SolveStatus(self.problem.get_status(), self.problem.gap, self.problem.hit_limit,
+                           self.problem.queue_wait)
 
 
 class ModelInput(object):
@@ -1121,3 +1311,43 @@ def freeze(d):
         return None
     else:
         return frozenset(list(d.items()))
+
+def get_forbidding_options(options):
+    """
+    Keys of get_option_item_positions() whose items the options rule out.
+    """
+    forbidding = []
+    if options['dofus'] == False:
+        forbidding.append('dofus')
+    elif options['dofus'] in ('lightset', 'cawwot'):
+        forbidding.append(options['dofus'])
+    for option in ('dragoturkey', 'seemyool', 'rhineetle', 'prysmaradite'):
+        if not options[option]:
+            forbidding.append(option)
+    return forbidding
+
+def get_option_item_positions(structure, items):
+    """
+    Positions in items of the items each option setting rules out: 'dofus'
+    for all Dofus, 'lightset' and 'cawwot' for the other two Dofus settings,
+    and each mount and the prysmaradite for their options turned off.
+    """
+    dofus_type = structure.get_type_id_by_name('Dofus')
+    pet_type = structure.get_type_id_by_name('Pet')
+    cawwot_id = structure.get_item_by_name('Cawwot Dofus').id
+    positions = {option: [] for option in ['dofus', 'lightset', 'cawwot', 'dragoturkey',
+                                           'seemyool', 'rhineetle', 'prysmaradite']}
+    for i, item in enumerate(items):
+        if item.type == dofus_type:
+            positions['dofus'].append(i)
+            if item.weird_conditions['light_set']:
+                positions['lightset'].append(i)
+            if item.id != cawwot_id:
+                positions['cawwot'].append(i)
+        if item.type == pet_type:
+            for name in ('Dragoturkey', 'Seemyool', 'Rhineetle'):
+                if name in item.name:
+                    positions[name.lower()].append(i)
+        if item.weird_conditions['prysmaradite']:
+            positions['prysmaradite'].append(i)
+    return positions
@@ -0,0 +1,85 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+import glob
+import hashlib
+import os
+import pickle
+import uuid
+
+from .fashionista_config import get_items_db_path, get_model_artifact_dir
+
+# The artifact also depends on the code that builds the model and on the
+# modules of the classes pickled with it.
+MODEL_SOURCES = ['model.py', 'lpproblem.py', 'restrictions.py', 'structure.py',
+                 'dofus_constants.py', 'reduction.py', 'mps_template.py', 'solve_handle.py',
+                 'solve_policy.py']
+
+
+def get_model_artifact_key(max_level=None):
+    md5 = hashlib.md5(str(max_level).encode())
+    with open(get_items_db_path(), 'rb') as f:
+        md5.update(f.read())
+    for source in MODEL_SOURCES:
+        with open(os.path.join(os.path.dirname(__file__), source), 'rb') as f:
+            md5.update(f.read())
+    return md5.hexdigest()
+
+
+def get_model_artifact_path(key, max_level=None):
+    # Each level band has its own artifact.
+    band = 'all' if max_level is None else max_level
+    return os.path.join(get_model_artifact_dir(), 'model_%s_%s.pickle' % (band, key))
+
+
+def load_model_artifact(max_level=None):
+    """
+    Compiled model state saved by save_model_artifact for the current item
+    database and level band, or None when there is none yet.
+    """
+    path = get_model_artifact_path(get_model_artifact_key(max_level), max_level)
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print('Could not load model artifact %s: %s' % (path, e))
+        return None
+
+
+def save_model_artifact(state, max_level=None):
+    key = get_model_artifact_key(max_level)
+    path = get_model_artifact_path(key, max_level)
+    tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print('Could not save model artifact %s: %s' % (path, e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    # Artifacts of previous item databases won't be used again.
+    for old_path in glob.glob(get_model_artifact_path('*', max_level)):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
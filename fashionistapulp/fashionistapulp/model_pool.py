@@ -15,33 +15,133 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 from .model import Model
-from threading import Lock
+from .structure import get_structure
+from threading import Condition, Lock, Thread
 
-from queue import Queue
+import pickle
 
+# Models a process keeps, whatever their band.
 MAX_MODELS = 2
-lock = Lock()
-model_queue = Queue()
-models_created = 0
-
-def create_model():
-    #print 'create_model start'
-    global models_created
-    with lock:
-        models_created += 1
-    new_model = Model()
-    model_queue.put(new_model)
-    #print 'create_model end'
-
-def borrow_model():
-    #print 'borrow_model'
-    if model_queue.empty() and models_created < MAX_MODELS:
-        create_model()
-
-    #print '%d models are created' % models_created
-
-    return model_queue.get()
+# Highest item level of each model family; a solve uses the smallest band
+# that has every item the character can wear.
+LEVEL_BANDS = [50, 100, 150, 199, 200]
+# Idle models of each band and models built or being built per band, guarded
+# by idle_condition. borrow_model() takes the one set up last for the closest
+# input.
+idle_condition = Condition(Lock())
+idle_models = {band: [] for band in LEVEL_BANDS}
+models_created = {band: 0 for band in LEVEL_BANDS}
+template_lock = Lock()
+# Compiled state of the first model of each band that still has models.
+template_states = {}
+
+def get_level_band(model_input):
+    # Locked items above the character level have to stay in the model to
+    # make it infeasible.
+    level = model_input.char_level
+    structure = get_structure()
+    for item_id in model_input.locked_equips.values():
+        item = structure.get_item_by_id(item_id) if isinstance(item_id, int) else None
+        if item is not None:
+            level = max(level, item.level)
+    for band in LEVEL_BANDS:
+        if level <= band:
+            return band
+    return LEVEL_BANDS[-1]
+
+def create_model(band=LEVEL_BANDS[-1]):
+    with idle_condition:
+        if sum(models_created.values()) >= MAX_MODELS:
+            return
+        models_created[band] += 1
+    grow_pool(band)
+
+def build_model(band):
+    # The first model of each band is the template the others of the band
+    # are cloned from, which only takes unpickling its compiled state.
+    with template_lock:
+        state = template_states.get(band)
+        if state is None:
+            new_model = Model(max_level=band)
+            template_states[band] = pickle.dumps(new_model.get_compiled_state(), pickle.HIGHEST_PROTOCOL)
+            return new_model
+    return Model(pickle.loads(state), max_level=band)
+
+def put_model(band, model):
+    with idle_condition:
+        idle_models[band].append(model)
+        idle_condition.notify_all()
+
+def take_idle_model(band, model_input):
+    """
+    Idle model of the band for the input, or once the process has all its
+    models, of the smallest larger band that has one. None when there is
+    none. Called with idle_condition held.
+    """
+    if sum(models_created.values()) < MAX_MODELS:
+        bands = [band]
+    else:
+        bands = LEVEL_BANDS[LEVEL_BANDS.index(band):]
+    for larger_band in bands:
+        models = idle_models[larger_band]
+        if models:
+            # The model set up last for the closest input has the least to redo.
+            model = min(models, key=lambda model: model.get_setup_distance(model_input))
+            models.remove(model)
+            return model
+    return None
+
+def drop_idle_model(band):
+    """
+    Drops an idle model of a band below the given one, which can't solve its
+    inputs, and the band's template with its last model. Returns whether
+    there was one. Called with idle_condition held.
+    """
+    for smaller_band in LEVEL_BANDS[:LEVEL_BANDS.index(band)]:
+        if idle_models[smaller_band]:
+            idle_models[smaller_band].pop(0)
+            models_created[smaller_band] -= 1
+            if models_created[smaller_band] == 0:
+                template_states.pop(smaller_band, None)
+            return True
+    return False
+
+def grow_pool(band):
+    try:
+        put_model(band, build_model(band))
+    except Exception:
+        with idle_condition:
+            models_created[band] -= 1
+            idle_condition.notify_all()
+        raise
+
+def grow_pool_in_background(band):
+    try:
+        grow_pool(band)
+    except Exception as e:
+        print('Could not add a model to the pool: %s' % e)
+
+def borrow_model(model_input):
+    band = get_level_band(model_input)
+    while True:
+        with idle_condition:
+            model = take_idle_model(band, model_input)
+            if model is not None:
+                return model
+            should_grow = sum(models_created.values()) < MAX_MODELS or drop_idle_model(band)
+            if should_grow:
+                models_created[band] += 1
+                is_first_model = models_created[band] == 1
+            if not should_grow or not is_first_model:
+                if should_grow:
+                    # A borrowed model may come back before the new one is ready.
+                    Thread(target=grow_pool_in_background, args=(band,), daemon=True).start()
+                idle_condition.wait()
+                continue
+        # Nothing else of the band could come back, build it here.
+        grow_pool(band)
     
 def return_model(borrowed_model):
     #print 'return_model'
-    model_queue.put(borrowed_model)
+    borrowed_model.reset_solution()
+    put_model(borrowed_model.max_level, borrowed_model)
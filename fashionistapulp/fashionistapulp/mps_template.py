@@ -0,0 +1,173 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import pulp
+
+SENSE_TO_MPS = {pulp.LpConstraintLE: b'L', pulp.LpConstraintEQ: b'E', pulp.LpConstraintGE: b'G'}
+MARKER_START = b"    MARK      'MARKER'                 'INTORG'\n"
+MARKER_END = b"    MARK      'MARKER'                 'INTEND'\n"
+
+
+def column_name(index):
+    return b'C%07d' % index
+
+def row_name(index):
+    return b'R%07d' % index
+
+
+class MpsTemplate:
+    """
+    MPS text of a LpProblem2 split into static bytes and the few sections
+    that change between solves. Columns, matrix coefficients, row names and
+    bounds are emitted once; render() only writes the objective entries, the
+    RHS section and the columns with adjustable coefficients, and leaves out
+    what the problem's Reduction drops.
+    """
+
+    def __init__(self, problem):
+        self.variables = problem.variables()
+        self.constraints = problem.constraints()
+        self.column_index = {var: i for i, var in enumerate(self.variables)}
+        self.name_index = {var.name: i for i, var in enumerate(self.variables)}
+        self.column_names = [column_name(i) for i in range(len(self.variables))]
+        self.row_names = [row_name(i) for i in range(len(self.constraints))]
+
+        self.row_lines = []
+        self.column_entries = [[] for _ in self.variables]
+        adjustable = problem.adjustable_coefficients
+        for r, constraint in enumerate(self.constraints):
+            self.row_lines.append(b' %s  %s\n' % (SENSE_TO_MPS[constraint.sense], self.row_names[r]))
+            for var, coef in constraint.items():
+                c = self.column_index[var]
+                # Adjustable entries are left as None and written at each render.
+                entry = None if (r, c) in adjustable else self.render_entry(r, c, coef)
+                self.column_entries[c].append((r, entry))
+        self.dynamic_columns = set(c for _, c in adjustable)
+        self.header = self.render_header(set())
+        self.column_rows = [frozenset(r for r, _ in entries) for entries in self.column_entries]
+
+        # Columns that appear in no row still need an entry to be declared,
+        # so they always carry their objective coefficient, even when zero.
+        self.column_prefixes = []
+        self.column_suffixes = []
+        self.empty_columns = []
+        for c, var in enumerate(self.variables):
+            self.column_prefixes.append(self.render_column_prefix(c, set()))
+            self.column_suffixes.append(MARKER_END if var.cat == pulp.LpInteger else b'')
+            self.empty_columns.append(not self.column_entries[c])
+
+        self.column_bounds = [b''.join(bound_lines_for(self.column_names[c], var))
+                              for c, var in enumerate(self.variables)]
+        self.bounds = self.render_bounds(set())
+
+    def render_header(self, dropped_rows):
+        return (b'NAME          MODEL\nROWS\n N  OBJ\n'
+                + b''.join(line for r, line in enumerate(self.row_lines) if r not in dropped_rows)
+                + b'COLUMNS\n')
+
+    def render_entry(self, r, c, coef):
+        return b'    %-8s  %-8s  % .12e\n' % (self.column_names[c], self.row_names[r], coef)
+
+    def render_column_prefix(self, c, dropped_rows):
+        is_integer = self.variables[c].cat == pulp.LpInteger
+        var = self.variables[c]
+        return ((MARKER_START if is_integer else b'')
+                + b''.join(entry if entry is not None else self.render_entry(r, c, self.constraints[r][var])
+                           for r, entry in self.column_entries[c] if r not in dropped_rows))
+
+    def render_bounds(self, dropped_columns):
+        return (b'BOUNDS\n'
+                + b''.join(bounds for c, bounds in enumerate(self.column_bounds)
+                           if c not in dropped_columns)
+                + b'ENDATA\n')
+
+    def render(self, objective, rhs, reduction=None):
+        dropped_columns = reduction.columns if reduction is not None else set()
+        dropped_rows = reduction.rows if reduction is not None else set()
+        parts = [self.render_header(dropped_rows) if dropped_rows else self.header]
+        for c, name in enumerate(self.column_names):
+            if c in dropped_columns:
+                continue
+            if c in self.dynamic_columns or (dropped_rows and not dropped_rows.isdisjoint(self.column_rows[c])):
+                prefix = self.render_column_prefix(c, dropped_rows)
+                is_empty = self.column_rows[c] <= dropped_rows
+            else:
+                prefix = self.column_prefixes[c]
+                is_empty = self.empty_columns[c]
+            parts.append(prefix)
+            coef = objective.get(c, 0)
+            if coef or is_empty:
+                parts.append(b'    %-8s  OBJ       % .12e\n' % (name, coef))
+            parts.append(self.column_suffixes[c])
+        parts.append(b'RHS\n')
+        for r, value in enumerate(rhs):
+            if value and r not in dropped_rows:
+                parts.append(b'    RHS       %-8s  % .12e\n' % (self.row_names[r], value))
+        parts.append(self.render_bounds(dropped_columns) if dropped_columns else self.bounds)
+        return b''.join(parts)
+
+    def render_problem(self, problem):
+        objective = {c: coef for c, coef in enumerate(problem.objective) if coef}
+        rhs = [-constraint.constant for constraint in self.constraints]
+        return self.render(objective, rhs, problem.reduction)
+
+    def render_start(self, initial_values, reduction=None):
+        """
+        CBC solution file with the given variable values, to be read back
+        with the 'mips' command as a MIP start.
+        """
+        dropped_columns = reduction.columns if reduction is not None else set()
+        lines = [b'Stopped on time - objective value 0\n']
+        for name, var_value in initial_values.items():
+            c = self.name_index.get(name)
+            if c is not None and c not in dropped_columns:
+                lines.append(b'%7d %s %15g 0\n' % (c, self.column_names[c], var_value))
+        return b''.join(lines)
+
+    def read_solution(self, sol_path):
+        values = [0.0] * len(self.variables)
+        with open(sol_path) as f:
+            f.readline()
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    break
+                if fields[0] == '**':
+                    fields = fields[1:]
+                name = fields[1]
+                if name[0] == 'C':
+                    values[int(name[1:])] = float(fields[2])
+        return values
+
+
+def bound_lines_for(name, var):
+    is_integer = var.cat == pulp.LpInteger
+    if var.lowBound is not None and var.lowBound == var.upBound:
+        return [b' FX BND       %-8s  % .12e\n' % (name, var.lowBound)]
+    elif var.lowBound == 0 and var.upBound == 1 and is_integer:
+        return [b' BV BND       %-8s\n' % name]
+    lines = []
+    if var.lowBound is not None:
+        # Integer columns without an upper bound would be read as binaries.
+        if var.lowBound != 0 or (is_integer and var.upBound is None):
+            lines.append(b' LO BND       %-8s  % .12e\n' % (name, var.lowBound))
+    elif var.upBound is not None:
+        lines.append(b' MI BND       %-8s\n' % name)
+    else:
+        lines.append(b' FR BND       %-8s\n' % name)
+    if var.upBound is not None:
+        lines.append(b' UP BND       %-8s  % .12e\n' % (name, var.upBound))
+    return lines
@@ -0,0 +1,66 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from collections import Counter
+
+
+class Reduction:
+    """
+    Columns and rows of a LpProblem2 that are left out of the solve for the
+    current input. Fixed columns are zero in every solution. Defined columns
+    only appear in rows that are left out and the equality row given for
+    them, from which their value is computed once the rest is solved. Other
+    dropped columns are left at zero.
+    """
+
+    def __init__(self):
+        self.columns = set()
+        self.fixed_columns = set()
+        self.defined_columns = {}
+        self.rows = set()
+        # Items left out because another item is as good, by item type.
+        self.dominated_items = Counter()
+
+    def fix_column(self, column):
+        self.columns.add(column)
+        self.fixed_columns.add(column)
+
+    def drop_column(self, column, defining_row=None):
+        self.columns.add(column)
+        if defining_row is not None:
+            self.defined_columns[column] = defining_row
+
+    def drop_row(self, row):
+        self.rows.add(row)
+
+    def keep_row(self, row):
+        self.rows.discard(row)
+
+    def restore(self, variables, constraints):
+        for column, row in self.defined_columns.items():
+            var = variables[column]
+            constraint = constraints[row]
+            total = -constraint.constant
+            for other_var, coef in constraint.items():
+                if other_var is not var:
+                    total -= coef * (other_var.varValue or 0)
+            var.varValue = total / constraint[var]
+
+    def __str__(self):
+        dominated = ', '.join('%s %d' % (type_name, count) for type_name, count
+                              in sorted(self.dominated_items.items()))
+        return ('%d columns and %d rows left out, dominated items: %s'
+                % (len(self.columns), len(self.rows), dominated or 'none'))
@@ -32,6 +32,7 @@ class Restrictions:
         self.fourth_set_constraints = {}
         self.min_condition_contraints = {}
         self.max_condition_contraints = {}
+        self.symmetry_constraints = {}
         self.stat_total_constraints = {}
         self.minimum_stat_constraints = {}
         self.advanced_minimum_stat_constraints = {}
@@ -0,0 +1,95 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+import ctypes
+import signal
+import subprocess
+import sys
+import time
+
+POLL_INTERVAL = 0.2
+PR_SET_PDEATHSIG = 1
+
+try:
+    libc = ctypes.CDLL('libc.so.6', use_errno=True) if sys.platform.startswith('linux') else None
+except OSError:
+    libc = None
+
+
+class SolveCancelled(Exception):
+    pass
+
+
+class SolveHandle:
+    """
+    Lets a request give up on its solve. The solve is cancelled by cancel(),
+    when the deadline passes or when is_client_gone() returns True; the
+    backends then kill the solver process and raise SolveCancelled.
+    """
+
+    def __init__(self, deadline=None, is_client_gone=None):
+        self.deadline = deadline
+        self.is_client_gone = is_client_gone
+        self.cancelled = False
+
+    @classmethod
+    def with_timeout(cls, timeout, is_client_gone=None):
+        return cls(time.time() + timeout, is_client_gone)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def is_cancelled(self):
+        if not self.cancelled:
+            if self.deadline is not None and time.time() >= self.deadline:
+                self.cancelled = True
+            elif self.is_client_gone is not None and self.is_client_gone():
+                self.cancelled = True
+        return self.cancelled
+
+    def check(self):
+        if self.is_cancelled():
+            raise SolveCancelled('Solve cancelled')
+
+    def communicate(self, process, input_=None):
+        """
+        Process.communicate() that kills the process when the solve is
+        cancelled while waiting for it.
+        """
+        while True:
+            try:
+                return process.communicate(input_, timeout=POLL_INTERVAL)
+            except subprocess.TimeoutExpired:
+                # The input has been handed over, it must not be sent again.
+                input_ = None
+                if self.is_cancelled():
+                    process.kill()
+                    process.communicate()
+                    raise SolveCancelled('Solve cancelled, killed solver process %d' % process.pid)
+
+
+def kill_with_parent():
+    # Asks the kernel to kill the solver when the thread that started it
+    # dies, e.g. when gunicorn kills a worker that went past its timeout.
+    libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+
+SOLVER_PREEXEC_FN = kill_with_parent if libc is not None else None
@@ -0,0 +1,112 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from .fashionista_config import get_config_value
+
+DEFAULT_TIME_LIMIT = 90
+# Relative gap below which a solution counts as optimal. CBC and python-mip
+# stop at 1e-4 by default.
+OPTIMALITY_TOLERANCE = 1e-4
+
+
+class SolvePolicy:
+    """
+    When a solve is allowed to stop: relative or absolute gap between the
+    best solution and the bound, time budget in seconds and node limit. The
+    solver returns its best solution when it stops on any of them. With
+    preflight, the LP relaxation is solved first to catch infeasible
+    problems before branch and bound. With lazy_conditions, the equip
+    condition rows are only added once a solution breaks them.
+    """
+
+    def __init__(self, gap_rel=None, gap_abs=None, time_limit=DEFAULT_TIME_LIMIT, max_nodes=None,
+                 preflight=True, lazy_conditions=False):
+        self.gap_rel = gap_rel
+        self.gap_abs = gap_abs
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.preflight = preflight
+        self.lazy_conditions = lazy_conditions
+
+    @classmethod
+    def from_config(cls):
+        return cls(_float_or_none(get_config_value('solver_gap_rel')),
+                   _float_or_none(get_config_value('solver_gap_abs')),
+                   float(get_config_value('solver_time_limit', DEFAULT_TIME_LIMIT)),
+                   _int_or_none(get_config_value('solver_max_nodes')),
+                   get_config_value('solver_preflight', 'True') == 'True',
+                   get_config_value('solver_lazy_conditions', 'False') == 'True')
+
+    def within(self, seconds):
+        """
+        Same policy with the time budget cut down to the given number of
+        seconds if it is longer.
+        """
+        if seconds is None or seconds >= self.time_limit:
+            return self
+        return SolvePolicy(self.gap_rel, self.gap_abs, seconds, self.max_nodes, self.preflight,
+                           self.lazy_conditions)
+
+    def get_cbc_options(self):
+        options = [('ratio', self.gap_rel),
+                   ('allow', self.gap_abs),
+                   ('sec', self.time_limit),
+                   ('maxNodes', self.max_nodes)]
+        return [(name, '%g' % value) for name, value in options if value is not None]
+
+
+class SolveStatus:
+    """
+    Outcome of a solve: the PuLP status string, the relative gap between the
+    returned solution and the best bound (None when unknown), whether the
+    solver was cut short by the time or node limit, in which case the result
+    is just the best incumbent found by then, and the seconds the solve
+    waited for a free solver slot.
+    """
+
+    def __init__(self, status, gap=None, hit_limit=False, queue_wait=0.0):
+        self.status = status
+        self.gap = gap
+        self.hit_limit = hit_limit
+        self.queue_wait = queue_wait
+
+    def is_proven_optimal(self):
+        return (self.status == 'Optimal' and not self.hit_limit
+                and self.gap is not None and self.gap <= OPTIMALITY_TOLERANCE)
+
+    def __str__(self):
+        if self.status != 'Optimal' or self.is_proven_optimal():
+            return self.status
+        gap = 'unknown gap' if self.gap is None else 'gap %.2f%%' % (100 * self.gap)
+        return '%s (%s%s)' % (self.status, gap, ', stopped on limit' if self.hit_limit else '')
+
+
+def relative_gap(objective, bound):
+    if objective is None or bound is None:
+        return None
+    if objective == bound:
+        return 0.0
+    if objective == 0:
+        return None
+    return abs(bound - objective) / abs(objective)
+
+
+def _float_or_none(config_value):
+    return float(config_value) if config_value is not None else None
+
+def _int_or_none(config_value):
+    return int(config_value) if config_value is not None else None
@@ -0,0 +1,104 @@
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import os
+import time
+from threading import Lock
+
+from .fashionista_config import get_solver_core_budget, get_solver_threads, get_solver_tmp_dir
+from .solve_handle import SolveHandle
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+POLL_INTERVAL = 0.1
+
+
+class HostSlots:
+    """
+    Machine wide pool of slots shared by every gunicorn worker through lock
+    files. A slot stays locked for as long as the process holding it is
+    alive, so crashed workers free their slot.
+    """
+
+    def __init__(self, directory, count):
+        self.directory = directory
+        self.count = count
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self):
+        for i in range(self.count):
+            slot_file = open(os.path.join(self.directory, 'slot_%d.lock' % i), 'a')
+            try:
+                fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot_file
+            except OSError:
+                slot_file.close()
+        return None
+
+    def release(self, slot_file):
+        fcntl.flock(slot_file, fcntl.LOCK_UN)
+        slot_file.close()
+
+
+class SolverAdmission:
+    """
+    Machine wide cap on the number of solves running at once, shared by all
+    gunicorn workers. The core budget is split in slots of one solver's
+    threads; a solve waits in line until it gets one.
+    """
+
+    def __init__(self, host_slots):
+        self.host_slots = host_slots
+
+    def acquire(self, handle=None):
+        """
+        Returns the slot and the seconds spent waiting for it. Raises
+        SolveCancelled if the handle is cancelled while waiting.
+        """
+        handle = handle if handle is not None else SolveHandle()
+        start = time.time()
+        if self.host_slots is None:
+            return None, 0.0
+        while True:
+            slot = self.host_slots.try_acquire()
+            if slot is not None:
+                return slot, time.time() - start
+            handle.check()
+            time.sleep(POLL_INTERVAL)
+
+    def release(self, slot):
+        if slot is not None:
+            self.host_slots.release(slot)
+
+
+admission_lock = Lock()
+solver_admission = None
+
+def get_solver_admission():
+    global solver_admission
+    if solver_admission is None:
+        with admission_lock:
+            if solver_admission is None:
+                host_slots = None
+                if fcntl is not None:
+                    slot_count = max(1, get_solver_core_budget() // get_solver_threads())
+                    host_slots = HostSlots(os.path.join(get_solver_tmp_dir(), 'fashionista_solver_slots'),
+                                           slot_count)
+                solver_admission = SolverAdmission(host_slots)
+    return solver_admission
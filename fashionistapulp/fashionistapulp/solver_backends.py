@@ -0,0 +1,788 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2020 The Dofus Fashionista
+# 
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 3 of the License, or (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+# 
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from .cbc_workers import CbcWorkerError, get_worker_pool
+from .fashionista_config import (get_fashionista_path, get_solver_backend_name,
+                                 get_cbc_worker_limits, get_solver_threads,
+                                 get_solver_tmp_dir)
+from .mps_template import MpsTemplate
+from .solve_handle import SOLVER_PREEXEC_FN, SolveCancelled
+from .solve_policy import relative_gap
+import copy
+import pulp
+import os
+import uuid
+import platform
+import re
+import subprocess
+import time
+
+try:
+    import mip
+    import mip.cbc
+except ImportError:
+    mip = None
+
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# Print debug information to confirm platform details
+print(f"System: {platform.system()}")
+print(f"Machine: {platform.machine()}")
+
+# Initialize solver variable
+SOLVER = None
+
+# Handle different platforms
+if platform.system() == 'Windows':
+    # Windows implementation
+    print("Detected Windows system. Looking for CBC solver...")
+    
+    # Check user home directory for .pulp/pulp.cfg which might contain solver path
+    pulp_cfg = os.path.join(os.path.expanduser("~"), ".pulp", "pulp.cfg")
+    if os.path.exists(pulp_cfg):
+        print(f"Found PuLP configuration at {pulp_cfg}")
+        # Use the default solver configured in the .pulp/pulp.cfg file
+        try:
+            SOLVER = pulp.PULP_CBC_CMD(msg=False, timeLimit=90)
+            print("Using CBC solver from configuration")
+        except Exception as e:
+            print(f"Error loading solver from config: {e}")
+    
+    # Try to find CBC in the project directory
+    if SOLVER is None:
+        try:
+            cbc_path = os.path.join(get_fashionista_path(), 'solvers', 'cbc', 'bin', 'cbc.exe')
+            if os.path.isfile(cbc_path):
+                print(f"Found CBC at {cbc_path}")
+                SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
+            else:
+                print(f"CBC not found at {cbc_path}")
+                # Fall back to default solver
+                SOLVER = pulp.PULP_CBC_CMD(msg=False, timeLimit=90)
+                print("Using default PuLP solver")
+        except Exception as e:
+            print(f"Error setting up solver: {e}")
+            # Last resort - use default solver with no specific configuration
+            SOLVER = pulp.CBC()
+            print("Using minimal CBC solver")
+
+elif platform.system() == 'Linux' and ('arm' in platform.machine() or 'aarch64' in platform.machine()):
+    # On Raspberry Pi (ARM architecture, both 32-bit and 64-bit)
+    cbc_path = '/usr/bin/cbc'
+    print(f"Detected ARM architecture. Using system-installed CBC at: {cbc_path}")
+    if not os.path.isfile(cbc_path):
+        raise FileNotFoundError(f"CBC binary not found at {cbc_path}")
+    SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
+else:
+    # On AWS or other x86_64 systems
+    cbc_path = os.path.join(get_fashionista_path(), 'fashionistapulp', 'fashionistapulp', 'cbc')
+    print(f"Detected non-ARM Linux system. Using project-specific CBC at: {cbc_path}")
+    if not os.path.isfile(cbc_path):
+        raise FileNotFoundError(f"CBC binary not found at {cbc_path}")
+    SOLVER = pulp.COIN_CMD(path=cbc_path, timeLimit=90)
+
+# Confirm which solver is being used
+if hasattr(SOLVER, 'path'):
+    print(f"Using CBC solver at: {SOLVER.path}")
+else:
+    print("Using default PuLP solver configuration")
+
+NODE_COUNT_RE = re.compile(r'^Enumerated nodes:\s+(\d+)', re.MULTILINE)
+OBJECTIVE_RE = re.compile(r'^Objective value:\s+(\S+)', re.MULTILINE)
+BOUND_RE = re.compile(r'^(?:Upper|Lower) bound:\s+(\S+)', re.MULTILINE)
+SOLUTION_OBJECTIVE_RE = re.compile(r'objective value\s+(\S+)')
+NO_SOLUTION_RE = re.compile(r'^No feasible solution found', re.MULTILINE)
+STOPPED_RE = re.compile(r'^Result - Stopped', re.MULTILINE)
+INTEGRALITY_TOLERANCE = 1e-6
+
+
+class CoinCmdBackend:
+    
+    name = 'coin_cmd'
+    
+    def available(self):
+        return SOLVER is not None
+    
+    def solve(self, problem):
+        problem_name = '/tmp/problem_%s' % str(uuid.uuid4())
+        problem.pulp_lp.name = problem_name
+        policy = problem.policy
+        solver = copy.copy(SOLVER)
+        solver.timeLimit = policy.time_limit
+        solver.optionsDict = dict(SOLVER.optionsDict, gapRel=policy.gap_rel, gapAbs=policy.gap_abs,
+                                  warmStart=bool(problem.initial_values),
+                                  threads=get_parallel_threads())
+        if policy.max_nodes is not None:
+            solver.options = SOLVER.options + ['maxNodes %d' % policy.max_nodes]
+        if problem.initial_values:
+            # PuLP writes the MIP start from the current value of every variable.
+            for var in problem.variables():
+                var.varValue = problem.initial_values.get(var.name)
+        problem.get_pulp_objective()
+        # PuLP runs CBC itself, so a cancelled solve can't be stopped before
+        # its time limit.
+        start = time.time()
+        problem.pulp_lp.solve(solver)
+        # The CBC output isn't available to check the status PuLP read, see
+        # read_cbc_status().
+        status = problem.pulp_lp.status
+        if ((status == pulp.LpStatusOptimal
+             and not is_incumbent(problem, [var.varValue or 0 for var in problem.variables()]))
+            or (status == pulp.LpStatusInfeasible and time.time() - start >= policy.time_limit)):
+            assign_solution(problem, [None] * len(problem.variables()),
+                            pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound)
+        
+        # The CBC output is not available here, so the gap is only known
+        # when the solve went all the way.
+        problem.hit_limit = problem.pulp_lp.sol_status == pulp.LpSolutionIntegerFeasible
+        if (problem.pulp_lp.sol_status == pulp.LpSolutionOptimal
+            and policy.gap_rel is None and policy.gap_abs is None):
+            problem.gap = 0.0
+        
+        tmpMps = os.path.join('%s-pulp.mps' % problem_name)
+        tmpSol = os.path.join('%s-pulp.sol' % problem_name)
+        tmpMst = os.path.join('%s-pulp.mst' % problem_name)
+        try: os.remove(tmpMps)
+        except: print('could not remove file %s' % tmpMps)
+        try: os.remove(tmpSol)
+        except: print('could not remove file %s' % tmpSol)
+        if problem.initial_values:
+            try: os.remove(tmpMst)
+            except: print('could not remove file %s' % tmpMst)
+
+    def solve_relaxation(self, problem):
+        # PuLP can't stop CBC after the LP, the MPS template path does it.
+        template_backend = BACKENDS['cbc_template']
+        if not template_backend.available():
+            return pulp.LpStatusNotSolved, None
+        return template_backend.solve_relaxation(problem)
+
+
+class CbcTemplateBackend:
+    """
+    Runs the CBC executable on an MPS file rendered from a cached
+    MpsTemplate instead of letting PuLP regenerate the whole file.
+    """
+    
+    name = 'cbc_template'
+    
+    def available(self):
+        return getattr(SOLVER, 'path', None) is not None
+    
+    def get_template(self, problem):
+        template = problem.backend_cache.get(self.name)
+        if template is None:
+            template = MpsTemplate(problem)
+            problem.backend_cache[self.name] = template
+        return template
+    
+    def solve(self, problem):
+        template = self.get_template(problem)
+        problem_name = os.path.join(get_solver_tmp_dir(), 'problem_%s' % uuid.uuid4().hex)
+        mps_path = '%s.mps' % problem_name
+        sol_path = '%s.sol' % problem_name
+        mst_path = None
+        try:
+            with open(mps_path, 'wb') as f:
+                f.write(template.render_problem(problem))
+            if problem.initial_values:
+                mst_path = '%s.mst' % problem_name
+                with open(mst_path, 'wb') as f:
+                    f.write(template.render_start(problem.initial_values, problem.reduction))
+            start = time.time()
+            output = self.run_cbc(problem, self.get_commands(problem.policy, mps_path,
+                                                             sol_path, mst_path))
+            timed_out = time.time() - start >= problem.policy.time_limit
+            if not os.path.exists(sol_path):
+                raise pulp.PulpSolverError('Error while executing %s' % SOLVER.path)
+            values = template.read_solution(sol_path)
+            status, sol_status = read_cbc_status(problem, sol_path, values, output, timed_out)
+            if status != pulp.LpStatusOptimal:
+                values = [None] * len(values)
+            assign_solution(problem, values, status, sol_status)
+            read_cbc_summary(problem, output)
+        finally:
+            for path in (mps_path, sol_path, mst_path):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+
+    def solve_relaxation(self, problem):
+        """
+        Solves the LP relaxation only. Returns its PuLP status and objective,
+        which bounds the objective of the MIP.
+        """
+        template = self.get_template(problem)
+        problem_name = os.path.join(get_solver_tmp_dir(), 'relaxation_%s' % uuid.uuid4().hex)
+        mps_path = '%s.mps' % problem_name
+        sol_path = '%s.sol' % problem_name
+        try:
+            with open(mps_path, 'wb') as f:
+                f.write(template.render_problem(problem))
+            self.run_cbc(problem, self.get_relaxation_commands(mps_path, sol_path))
+            if not os.path.exists(sol_path):
+                raise pulp.PulpSolverError('Error while executing %s' % SOLVER.path)
+            return read_relaxation(sol_path)
+        finally:
+            for path in (mps_path, sol_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def get_relaxation_commands(self, mps_path, sol_path):
+        return [mps_path, 'max', 'initialSolve', 'solution', sol_path]
+
+    def get_commands(self, policy, mps_path, sol_path, mst_path):
+        commands = [mps_path, 'max']
+        if mst_path is not None:
+            commands += ['mips', mst_path]
+        for option, option_value in get_cbc_options(policy):
+            commands += [option, option_value]
+        return commands + ['branch', 'printingOptions', 'all', 'solution', sol_path]
+
+    def run_cbc(self, problem, commands):
+        cbc = subprocess.Popen([SOLVER.path] + commands, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, text=True,
+                               preexec_fn=SOLVER_PREEXEC_FN)
+        output, _ = problem.handle.communicate(cbc)
+        if cbc.returncode != 0:
+            raise pulp.PulpSolverError('Error while executing %s' % SOLVER.path)
+        return output
+
+
+class CbcWorkerBackend(CbcTemplateBackend):
+    """
+    Same input and output files as cbc_template, but the problem is handed to
+    an already running CBC process from the worker pool instead of a fresh
+    executable.
+    """
+    
+    name = 'cbc_worker'
+    
+    def get_commands(self, policy, mps_path, sol_path, mst_path):
+        commands = ['import %s' % mps_path, 'max']
+        if mst_path is not None:
+            commands.append('mips %s' % mst_path)
+        for option, option_value in get_cbc_options(policy):
+            commands.append('%s %s' % (option, option_value))
+        return commands + ['branch', 'printingOptions all', 'solution %s' % sol_path]
+
+    def get_relaxation_commands(self, mps_path, sol_path):
+        return ['import %s' % mps_path, 'max', 'initialSolve', 'solution %s' % sol_path]
+
+    def run_cbc(self, problem, commands):
+        workers_per_process, workers_per_host = get_cbc_worker_limits()
+        pool = get_worker_pool(SOLVER.path, workers_per_process, workers_per_host,
+                               os.path.join(get_solver_tmp_dir(), 'fashionista_cbc_slots'))
+        try:
+            worker = pool.borrow(problem.policy.time_limit, problem.handle)
+        except CbcWorkerError as e:
+            raise pulp.PulpSolverError(str(e))
+        try:
+            output = worker.run_commands(commands, problem.handle)
+        except CbcWorkerError as e:
+            pool.discard(worker)
+            raise pulp.PulpSolverError(str(e))
+        except SolveCancelled:
+            pool.give_back(worker)
+            raise
+        pool.give_back(worker)
+        return output
+
+
+def get_parallel_threads():
+    # CBC switches to its parallel search as soon as threads is set, even to 1.
+    threads = get_solver_threads()
+    return threads if threads > 1 else None
+
+
+def get_cbc_options(policy):
+    threads = get_parallel_threads()
+    return policy.get_cbc_options() + ([('threads', str(threads))] if threads else [])
+
+
+def read_cbc_summary(problem, cbc_output):
+    node_count = NODE_COUNT_RE.search(cbc_output)
+    problem.node_count = int(node_count.group(1)) if node_count else None
+    problem.hit_limit = problem.pulp_lp.sol_status == pulp.LpSolutionIntegerFeasible
+    objective = OBJECTIVE_RE.search(cbc_output)
+    if objective is not None and problem.pulp_lp.status == pulp.LpStatusOptimal:
+        # CBC only prints the bound when it did not prove optimality.
+        bound = BOUND_RE.search(cbc_output)
+        objective = float(objective.group(1))
+        problem.gap = relative_gap(objective, float(bound.group(1)) if bound else objective)
+
+
+def read_cbc_status(problem, sol_path, values, cbc_output, timed_out):
+    """
+    PuLP status of a CBC solve, checked against its output. PuLP takes any
+    stop with an objective in the solution file for a solution, even a stop
+    during the root LP, whose values are the unfinished LP's. CBC also calls
+    a search or preprocessing cut short by the time limit infeasible.
+    """
+    status, sol_status = SOLVER.get_status(sol_path)
+    if status == pulp.LpStatusOptimal:
+        if (NO_SOLUTION_RE.search(cbc_output) or OBJECTIVE_RE.search(cbc_output) is None
+            or not is_incumbent(problem, values)):
+            return pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound
+    elif status == pulp.LpStatusInfeasible and (timed_out or STOPPED_RE.search(cbc_output)):
+        return pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound
+    return status, sol_status
+
+
+def is_incumbent(problem, values):
+    """
+    Whether values are integer where they have to be and their objective is
+    not above the bound of the LP relaxation, when there is one.
+    """
+    objective = 0.0
+    for var, coef, var_value in zip(problem.variables(), problem.objective, values):
+        if var_value is None:
+            return False
+        if var.cat == pulp.LpInteger and abs(var_value - round(var_value)) > INTEGRALITY_TOLERANCE:
+            return False
+        objective += coef * var_value
+    bound = problem.relaxation_bound
+    return bound is None or objective <= bound + INTEGRALITY_TOLERANCE * max(1.0, abs(bound))
+
+
+def read_relaxation(sol_path):
+    status, _ = SOLVER.get_status(sol_path)
+    with open(sol_path) as f:
+        header = f.readline()
+    # PuLP also reads a stopped LP as optimal, its objective bounds nothing.
+    if status == pulp.LpStatusOptimal and not header.startswith('Optimal'):
+        return pulp.LpStatusNotSolved, None
+    if status != pulp.LpStatusOptimal:
+        return status, None
+    match = SOLUTION_OBJECTIVE_RE.search(header)
+    return status, float(match.group(1)) if match else None
+
+
+def assign_solution(problem, values, status, sol_status):
+    for var, var_value in zip(problem.variables(), values):
+        var.varValue = var_value
+    problem.pulp_lp.assignStatus(status, sol_status)
+
+
+class InProcessCbcBackend:
+    """
+    Solves with the CBC library loaded in-process through python-mip.
+    The mip model is built once per LpProblem2 and only the right hand sides
+    and objective coefficients that changed are pushed before each solve.
+    """
+    
+    name = 'in_process'
+    
+    def available(self):
+        return mip is not None
+    
+    def get_model(self, problem):
+        in_process_model = problem.backend_cache.get(self.name)
+        if in_process_model is None:
+            in_process_model = InProcessCbcModel(problem)
+            problem.backend_cache[self.name] = in_process_model
+        return in_process_model
+    
+    def solve(self, problem):
+        self.get_model(problem).solve(problem)
+
+    def solve_relaxation(self, problem):
+        return self.get_model(problem).solve_relaxation(problem)
+
+
+if mip is not None:
+    MIP_STATUS_TO_PULP = {
+        mip.OptimizationStatus.OPTIMAL: (pulp.LpStatusOptimal, pulp.LpSolutionOptimal),
+        mip.OptimizationStatus.FEASIBLE: (pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible),
+        mip.OptimizationStatus.INFEASIBLE: (pulp.LpStatusInfeasible, pulp.LpSolutionInfeasible),
+        mip.OptimizationStatus.INT_INFEASIBLE: (pulp.LpStatusInfeasible, pulp.LpSolutionInfeasible),
+        mip.OptimizationStatus.UNBOUNDED: (pulp.LpStatusUnbounded, pulp.LpSolutionUnbounded),
+        mip.OptimizationStatus.NO_SOLUTION_FOUND: (pulp.LpStatusNotSolved,
+                                                   pulp.LpSolutionNoSolutionFound),
+    }
+    # Return codes of Cbc_solveLinearProgram.
+    CBC_LP_STATUS_TO_PULP = {0: pulp.LpStatusOptimal,
+                             2: pulp.LpStatusInfeasible,
+                             3: pulp.LpStatusUnbounded}
+
+
+class InProcessCbcModel:
+    
+    def __init__(self, problem):
+        self.model = mip.Model(sense=mip.MAXIMIZE, solver_name=mip.CBC)
+        self.model.verbose = 0
+        
+        self.pulp_vars = problem.variables()
+        self.mip_vars = {}
+        self.mip_vars_by_name = {}
+        for pulp_var in self.pulp_vars:
+            lb = pulp_var.lowBound if pulp_var.lowBound is not None else -mip.INF
+            ub = pulp_var.upBound if pulp_var.upBound is not None else mip.INF
+            var_type = mip.INTEGER if pulp_var.cat == pulp.LpInteger else mip.CONTINUOUS
+            self.mip_vars[pulp_var] = self.model.add_var(pulp_var.name, lb, ub, var_type=var_type)
+            self.mip_vars_by_name[pulp_var.name] = self.mip_vars[pulp_var]
+        
+        self.constraints = problem.constraints()
+        self.mip_constrs = []
+        self.rhs = []
+        for constraint in self.constraints:
+            self.mip_constrs.append(self.add_constr(constraint))
+            self.rhs.append(-constraint.constant)
+        
+        self.adjustable_coefficients = problem.adjustable_coefficients
+        self.coefficients = self.get_coefficients()
+        self.objective = [0.0] * len(self.pulp_vars)
+        self.default_gaps = (self.model.max_mip_gap, self.model.max_mip_gap_abs)
+        self.fixed_columns = set()
+        
+    def add_constr(self, constraint):
+        expr = mip.xsum(coef * self.mip_vars[var] for var, coef in constraint.items())
+        rhs = -constraint.constant
+        if constraint.sense == pulp.LpConstraintLE:
+            return self.model.add_constr(expr <= rhs)
+        elif constraint.sense == pulp.LpConstraintGE:
+            return self.model.add_constr(expr >= rhs)
+        return self.model.add_constr(expr == rhs)
+    
+    def get_coefficients(self):
+        return {(r, c): self.constraints[r][self.pulp_vars[c]] for r, c in self.adjustable_coefficients}
+    
+    def update_coefficients(self):
+        # The CBC library can't change a matrix coefficient, so the rows
+        # with changed coefficients are removed and added again.
+        coefficients = self.get_coefficients()
+        changed_rows = sorted(set(r for (r, c), coef in coefficients.items()
+                                  if coef != self.coefficients[(r, c)]))
+        if changed_rows:
+            self.model.remove([self.mip_constrs[r] for r in changed_rows])
+            for r in changed_rows:
+                self.mip_constrs[r] = self.add_constr(self.constraints[r])
+                self.rhs[r] = -self.constraints[r].constant
+        self.coefficients = coefficients
+    
+    def update_fixed_columns(self, reduction):
+        # Rows stay in the model, the columns the reduction fixes are only
+        # given a zero upper bound.
+        for c in reduction.fixed_columns - self.fixed_columns:
+            self.mip_vars[self.pulp_vars[c]].ub = 0
+        for c in self.fixed_columns - reduction.fixed_columns:
+            upper_bound = self.pulp_vars[c].upBound
+            self.mip_vars[self.pulp_vars[c]].ub = upper_bound if upper_bound is not None else mip.INF
+        self.fixed_columns = set(reduction.fixed_columns)
+    
+    def update_rhs(self):
+        for i, constraint in enumerate(self.constraints):
+            rhs = -constraint.constant
+            if rhs != self.rhs[i]:
+                self.mip_constrs[i].rhs = rhs
+                self.rhs[i] = rhs
+    
+    def update_objective(self, objective):
+        for c, coef in enumerate(objective):
+            if coef != self.objective[c]:
+                self.mip_vars[self.pulp_vars[c]].obj = coef
+        self.objective = list(objective)
+    
+    def set_start(self, initial_values):
+        # Model.start sets every integer variable it is not given to zero, which
+        # makes our partial starts infeasible. CBC completes them by itself.
+        start = [(self.mip_vars_by_name[name].idx, var_value)
+                 for name, var_value in (initial_values or {}).items()
+                 if name in self.mip_vars_by_name]
+        columns = mip.cbc.ffi.new('int[]', [column for column, _ in start])
+        values = mip.cbc.ffi.new('double[]', [var_value for _, var_value in start])
+        mip.cbc.cbclib.Cbc_setMIPStartI(self.model.solver._model, len(start), columns, values)
+    
+    def solve_relaxation(self, problem):
+        self.update_coefficients()
+        self.update_rhs()
+        self.update_objective(problem.objective)
+        self.update_fixed_columns(problem.reduction)
+        # Model.optimize(relax=True) mixes up the infeasible and unbounded
+        # return codes, so the LP is solved through the library directly.
+        cbc_model = self.model.solver._model
+        mip.cbc.cbclib.Cbc_setLogLevel(cbc_model, 0)
+        status = CBC_LP_STATUS_TO_PULP.get(mip.cbc.cbclib.Cbc_solveLinearProgram(cbc_model),
+                                           pulp.LpStatusNotSolved)
+        if status != pulp.LpStatusOptimal:
+            return status, None
+        return status, mip.cbc.cbclib.Cbc_getObjValue(cbc_model)
+    
+    def solve(self, problem):
+        self.update_coefficients()
+        self.update_rhs()
+        self.update_objective(problem.objective)
+        self.update_fixed_columns(problem.reduction)
+        self.set_start(problem.initial_values)
+        
+        policy = problem.policy
+        self.model.max_mip_gap = policy.gap_rel if policy.gap_rel is not None else self.default_gaps[0]
+        self.model.max_mip_gap_abs = policy.gap_abs if policy.gap_abs is not None else self.default_gaps[1]
+        # python-mip skips limits left at their default value, so a node limit
+        # from a previous solve would stick without an explicit large one.
+        max_nodes = policy.max_nodes if policy.max_nodes is not None else mip.INT_MAX - 1
+        self.model.threads = get_parallel_threads() or 0
+        
+        # The solve runs in this thread and can't be killed when cancelled, it
+        # only gets the time left before the handle's deadline.
+        status = self.model.optimize(max_seconds=policy.time_limit, max_nodes=max_nodes)
+        if status not in MIP_STATUS_TO_PULP:
+            raise pulp.PulpSolverError('In-process CBC failed with status %s' % status)
+        
+        has_solution = self.model.num_solutions > 0
+        for pulp_var in self.pulp_vars:
+            pulp_var.varValue = self.mip_vars[pulp_var].x if has_solution else None
+        problem.pulp_lp.assignStatus(*MIP_STATUS_TO_PULP[status])
+        if has_solution:
+            problem.gap = relative_gap(self.model.objective_value, self.model.objective_bound)
+        problem.hit_limit = status == mip.OptimizationStatus.FEASIBLE
+
+
+class HighsBackend:
+    """
+    Solves with HiGHS through highspy when it is installed. Like in_process,
+    the HiGHS model is built once per LpProblem2 and only updated afterwards.
+    """
+    
+    name = 'highs'
+    
+    def available(self):
+        return highspy is not None
+    
+    def get_model(self, problem):
+        highs_model = problem.backend_cache.get(self.name)
+        if highs_model is None:
+            highs_model = HighsModel(problem)
+            problem.backend_cache[self.name] = highs_model
+        return highs_model
+    
+    def solve(self, problem):
+        self.get_model(problem).solve(problem)
+
+    def solve_relaxation(self, problem):
+        return self.get_model(problem).solve_relaxation(problem)
+
+
+if highspy is not None:
+    HIGHS_STATUS_TO_PULP = {
+        highspy.HighsModelStatus.kOptimal: (pulp.LpStatusOptimal, pulp.LpSolutionOptimal),
+        highspy.HighsModelStatus.kInfeasible: (pulp.LpStatusInfeasible, pulp.LpSolutionInfeasible),
+        highspy.HighsModelStatus.kUnbounded: (pulp.LpStatusUnbounded, pulp.LpSolutionUnbounded),
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: (pulp.LpStatusInfeasible,
+                                                          pulp.LpSolutionInfeasible),
+    }
+    HIGHS_LIMIT_STATUSES = {highspy.HighsModelStatus.kTimeLimit,
+                            highspy.HighsModelStatus.kIterationLimit,
+                            highspy.HighsModelStatus.kSolutionLimit,
+                            highspy.HighsModelStatus.kInterrupt}
+
+
+class HighsModel:
+    
+    def __init__(self, problem):
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', False)
+        inf = highspy.kHighsInf
+        
+        self.pulp_vars = problem.variables()
+        self.column_index = {var: i for i, var in enumerate(self.pulp_vars)}
+        self.name_index = {var.name: i for i, var in enumerate(self.pulp_vars)}
+        self.constraints = problem.constraints()
+        
+        lp = highspy.HighsLp()
+        lp.num_col_ = len(self.pulp_vars)
+        lp.num_row_ = len(self.constraints)
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.col_cost_ = [0.0] * lp.num_col_
+        lp.col_lower_ = [self.column_lower(c) for c in range(lp.num_col_)]
+        lp.col_upper_ = [var.upBound if var.upBound is not None else inf for var in self.pulp_vars]
+        lp.integrality_ = [highspy.HighsVarType.kInteger if var.cat == pulp.LpInteger
+                           else highspy.HighsVarType.kContinuous for var in self.pulp_vars]
+        
+        self.rhs = [-constraint.constant for constraint in self.constraints]
+        lp.row_lower_ = [self.row_bounds(r)[0] for r in range(lp.num_row_)]
+        lp.row_upper_ = [self.row_bounds(r)[1] for r in range(lp.num_row_)]
+        starts, indices, values = [0], [], []
+        for constraint in self.constraints:
+            for var, coef in constraint.items():
+                indices.append(self.column_index[var])
+                values.append(coef)
+            starts.append(len(indices))
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.start_ = starts
+        lp.a_matrix_.index_ = indices
+        lp.a_matrix_.value_ = values
+        lp.a_matrix_.num_col_ = lp.num_col_
+        lp.a_matrix_.num_row_ = lp.num_row_
+        if self.highs.passModel(lp) != highspy.HighsStatus.kOk:
+            raise pulp.PulpSolverError('HiGHS rejected the model')
+        
+        self.adjustable_coefficients = problem.adjustable_coefficients
+        self.coefficients = self.get_coefficients()
+        self.objective = [0.0] * lp.num_col_
+        self.fixed_columns = set()
+    
+    def get_coefficients(self):
+        return {(r, c): self.constraints[r][self.pulp_vars[c]] for r, c in self.adjustable_coefficients}
+    
+    def update_coefficients(self):
+        coefficients = self.get_coefficients()
+        for (r, c), coef in coefficients.items():
+            if coef != self.coefficients[(r, c)]:
+                self.highs.changeCoeff(r, c, coef)
+        self.coefficients = coefficients
+    
+    def update_fixed_columns(self, reduction):
+        # Like in_process, only the upper bound of fixed columns changes.
+        for c in reduction.fixed_columns - self.fixed_columns:
+            self.highs.changeColBounds(c, self.column_lower(c), 0)
+        for c in self.fixed_columns - reduction.fixed_columns:
+            upper_bound = self.pulp_vars[c].upBound
+            self.highs.changeColBounds(c, self.column_lower(c),
+                                       upper_bound if upper_bound is not None else highspy.kHighsInf)
+        self.fixed_columns = set(reduction.fixed_columns)
+    
+    def column_lower(self, c):
+        lower_bound = self.pulp_vars[c].lowBound
+        return lower_bound if lower_bound is not None else -highspy.kHighsInf
+    
+    def row_bounds(self, r):
+        sense = self.constraints[r].sense
+        rhs = self.rhs[r]
+        if sense == pulp.LpConstraintLE:
+            return -highspy.kHighsInf, rhs
+        elif sense == pulp.LpConstraintGE:
+            return rhs, highspy.kHighsInf
+        return rhs, rhs
+    
+    def update_rhs(self):
+        for r, constraint in enumerate(self.constraints):
+            rhs = -constraint.constant
+            if rhs != self.rhs[r]:
+                self.rhs[r] = rhs
+                self.highs.changeRowBounds(r, *self.row_bounds(r))
+    
+    def update_objective(self, objective):
+        for c, coef in enumerate(objective):
+            if coef != self.objective[c]:
+                self.highs.changeColCost(c, coef)
+        self.objective = list(objective)
+    
+    def set_start(self, initial_values):
+        start = [(self.name_index[name], var_value)
+                 for name, var_value in (initial_values or {}).items()
+                 if name in self.name_index]
+        if start:
+            # HiGHS completes a partial start by itself.
+            self.highs.setSolution(len(start), [c for c, _ in start], [v for _, v in start])
+    
+    def reset_options(self, policy):
+        # Options are reset so that nothing is left over from the previous solve.
+        self.highs.resetOptions()
+        self.highs.setOptionValue('output_flag', False)
+        self.highs.setOptionValue('time_limit', float(policy.time_limit))
+    
+    def solve_relaxation(self, problem):
+        self.update_coefficients()
+        self.update_rhs()
+        self.update_objective(problem.objective)
+        self.update_fixed_columns(problem.reduction)
+        self.highs.clearSolver()
+        self.reset_options(problem.policy)
+        self.highs.setOptionValue('solve_relaxation', True)
+        self.highs.run()
+        model_status = self.highs.getModelStatus()
+        if model_status == highspy.HighsModelStatus.kOptimal:
+            return pulp.LpStatusOptimal, self.highs.getInfo().objective_function_value
+        elif model_status == highspy.HighsModelStatus.kInfeasible:
+            return pulp.LpStatusInfeasible, None
+        return pulp.LpStatusNotSolved, None
+    
+    def solve(self, problem):
+        self.update_coefficients()
+        self.update_rhs()
+        self.update_objective(problem.objective)
+        self.update_fixed_columns(problem.reduction)
+        self.highs.clearSolver()
+        self.set_start(problem.initial_values)
+        
+        policy = problem.policy
+        self.reset_options(policy)
+        if policy.gap_rel is not None:
+            self.highs.setOptionValue('mip_rel_gap', policy.gap_rel)
+        if policy.gap_abs is not None:
+            self.highs.setOptionValue('mip_abs_gap', policy.gap_abs)
+        if policy.max_nodes is not None:
+            self.highs.setOptionValue('mip_max_nodes', policy.max_nodes)
+        
+        # Like in_process, the solve can't be stopped when cancelled.
+        self.highs.run()
+        model_status = self.highs.getModelStatus()
+        info = self.highs.getInfo()
+        has_solution = (info.primal_solution_status
+                        == highspy.SolutionStatus.kSolutionStatusFeasible)
+        if model_status in HIGHS_STATUS_TO_PULP:
+            status = HIGHS_STATUS_TO_PULP[model_status]
+        elif model_status in HIGHS_LIMIT_STATUSES:
+            status = ((pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible) if has_solution
+                      else (pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound))
+        else:
+            raise pulp.PulpSolverError('HiGHS failed with status %s'
+                                       % self.highs.modelStatusToString(model_status))
+        
+        values = self.highs.getSolution().col_value if has_solution else None
+        for c, pulp_var in enumerate(self.pulp_vars):
+            pulp_var.varValue = values[c] if has_solution else None
+        problem.pulp_lp.assignStatus(*status)
+        problem.node_count = info.mip_node_count
+        if has_solution:
+            problem.gap = relative_gap(info.objective_function_value, info.mip_dual_bound)
+        problem.hit_limit = status[1] == pulp.LpSolutionIntegerFeasible
+
+
+# Backends in the order they are tried when the one before fails, so that a
+# problem in one mechanism is followed by a different one.
+BACKENDS = {}
+
+def register_backend(backend):
+    BACKENDS[backend.name] = backend
+
+for registered_backend in [CbcTemplateBackend(), InProcessCbcBackend(), HighsBackend(),
+                           CbcWorkerBackend(), CoinCmdBackend()]:
+    register_backend(registered_backend)
+
+def get_available_backend_names():
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def get_fallback_backend_names(name=None):
+    """
+    The backend to use first, then the other available ones to fall back to.
+    """
+    first = get_backend(name).name
+    return [first] + [other for other in get_available_backend_names() if other != first]
+
+def get_backend(name=None):
+    if name is None:
+        name = get_solver_backend_name()
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available():
+        print('Solver backend %s is not available, using coin_cmd' % name)
+        backend = BACKENDS['coin_cmd']
+    return backend
@@ -77,6 +77,7 @@ class Structure:
         #self.insert_turquoises()
         #self.insert_gelanos()
         self.build_indexes()
+        self.build_columnar_arrays()
         self.separate_items()
         self.read_item_names_table()
         self.post_process_item_names()
@@ -602,6 +603,34 @@ class Structure:
         self.stats_list_names_sorted = [stat.name for stat in
             sorted(self.stats_list, key=lambda stat: STAT_ORDER[stat.key])]
 
+    def build_columnar_arrays(self):
+        self.item_stat_arrays = self._get_item_stat_arrays(self.available_items_list)
+        self.dt_item_stat_arrays = self._get_item_stat_arrays(self.dt_available_items_list)
+        self.set_bonus_arrays = self._get_set_bonus_arrays(self.sets_list)
+        self.dt_set_bonus_arrays = self._get_set_bonus_arrays(self.dt_sets_list)
+
+    def _get_item_stat_arrays(self, items_list):
+        # Sparse item x stat matrix: position in items_list, stat id, value.
+        positions, stat_ids, values = [], [], []
+        for position, item in enumerate(items_list):
+            for stat_id, value in item.stats:
+                positions.append(position)
+                stat_ids.append(stat_id)
+                values.append(value)
+        return positions, stat_ids, values
+
+    def _get_set_bonus_arrays(self, sets_list):
+        # Sparse set x bonus tier matrix: position in sets_list, number of
+        # items, stat id, value.
+        positions, num_items_list, stat_ids, values = [], [], [], []
+        for position, item_set in enumerate(sets_list):
+            for num_items, stat_id, value in item_set.bonus:
+                positions.append(position)
+                num_items_list.append(num_items)
+                stat_ids.append(stat_id)
+                values.append(value)
+        return positions, num_items_list, stat_ids, values
+
     def _is_item_available(self, item):
         return not item.removed
 
@@ -802,6 +831,18 @@ class Structure:
         else:
             return self.sets_list
 
+    def get_item_stat_arrays(self, dofus_touch=False):
+        if dofus_touch:
+            return self.dt_item_stat_arrays
+        else:
+            return self.item_stat_arrays
+
+    def get_set_bonus_arrays(self, dofus_touch=False):
+        if dofus_touch:
+            return self.dt_set_bonus_arrays
+        else:
+            return self.set_bonus_arrays
+
     def get_stats_list(self):
         return self.stats_list
         
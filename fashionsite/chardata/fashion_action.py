@@ -16,28 +16,36 @@
 
 from django.conf import settings
 from django.urls import reverse
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
 import pickle
+import socket
 
 from chardata.lock_forbid import get_all_exclusions_en_names, get_all_inclusions_en_names,\
     get_inclusions_dict, get_all_exclusions_ids
 from chardata.min_stats import get_min_stats_digested
 from chardata.models import CharBaseStats
-from chardata.solution import set_minimal_solution
+from chardata.solution import get_minimal_solution, set_minimal_solution
 from chardata.solution_memory import DatabaseSolutionMemory
 from chardata.stats_weights import get_stats_weights
 from chardata.util import get_char_or_raise, get_base_stats_by_attr, \
     remove_cache_for_char
 from chardata.util_views import error
 from fashionistapulp.dofus_constants import STATS_NAMES
+from fashionistapulp.fashionista_config import get_request_deadline
+from fashionistapulp.input_normalization import normalize_model_input
 from fashionistapulp.model import ModelInput
 from fashionistapulp.model_pool import create_model, borrow_model, return_model
+from fashionistapulp.solve_handle import SolveCancelled, SolveHandle
+from fashionistapulp.solve_policy import SolvePolicy
 
 
 if not settings.DEBUG:
     create_model()
 
 MEMORY = DatabaseSolutionMemory()
+# Outcomes of a solve that are worth keeping, an optimal one includes the
+# best build found before a limit.
+MEMOIZED_STATUSES = ('Optimal', 'Infeasible')
 
 def get_options(request, char_id):
     char = get_char_or_raise(request, char_id)
@@ -88,35 +96,48 @@ def fashion(request, char_id, spells=False):
         stat_points_to_distribute = 0
         
     # TODO: Sanity check input.
-    model_input = ModelInput(char.level,
-                             base_stats_by_attr,
-                             min_stats,
-                             inclusions_dic,
-                             set(exclusions),
-                             weights,
-                             model_options,
-                             char.char_class,
-                             stat_points_to_distribute)
+    # The solution memory and the model only see the normalized input.
+    model_input = normalize_model_input(ModelInput(char.level,
+                                                   base_stats_by_attr,
+                                                   min_stats,
+                                                   inclusions_dic,
+                                                   set(exclusions),
+                                                   weights,
+                                                   model_options,
+                                                   char.char_class,
+                                                   stat_points_to_distribute))
 
     solved_status = None
     stats = None
     result = None
 
     memoized_result = MEMORY.get(model_input)
-    if memoized_result is not None:
+    # Solves cut short without a solution were stored before, they are
+    # solved again. Older entries hold the status string itself.
+    if (memoized_result is not None
+        and getattr(memoized_result[0], 'status', memoized_result[0]) in MEMOIZED_STATUSES):
         solved_status, stats, result = memoized_result
     else:
-        model = borrow_model()
-        model.setup(model_input)
-    
-        model.run(2)
-        solved_status = model.get_solved_status()
-        if solved_status == 'Optimal':
-            stats = model.get_stats()
-            result = model.get_result_minimal()
-
-        return_model(model)
-        MEMORY.put(model_input, (model.get_solved_status(), stats, result))
+        handle = SolveHandle.with_timeout(get_request_deadline(), client_gone_check(request))
+        model = borrow_model(model_input)
+        try:
+            model.setup(model_input)
+        
+            model.run(2, initial_solution=get_minimal_solution(char),
+                      policy=SolvePolicy.from_config(), handle=handle)
+            solved_status = model.get_solved_status()
+            if solved_status.status == 'Optimal':
+                stats = model.get_stats()
+                result = model.get_result_minimal()
+        except SolveCancelled:
+            return too_busy()
+        finally:
+            return_model(model)
+        # Without a solution or a proof of infeasibility, the deadline ran
+        # out and another try may do better.
+        if solved_status.status not in MEMOIZED_STATUSES:
+            return too_busy()
+        MEMORY.put(model_input, (solved_status, stats, result))
 
     if result is None: 
         return HttpResponseRedirect(reverse('infeasible', args=(char.id,)))
@@ -130,6 +151,25 @@ def fashion(request, char_id, spells=False):
     
     return HttpResponseRedirect(reverse('solution_2', args=(char.id,)))
 
+def too_busy():
+    return HttpResponse('The Fashionista is too busy right now, please try again later.',
+                        status=503)
+
+def client_gone_check(request):
+    client_socket = request.META.get('gunicorn.socket')
+    if client_socket is None:
+        return None
+
+    def is_client_gone():
+        # A closed connection reads as empty, an open idle one would block.
+        try:
+            return client_socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+    return is_client_gone
+
 def set_stats(char, stats):
     for element_name, abr in STATS_NAMES:
         basestats_list = CharBaseStats.objects.filter(char=char, stat=element_name)
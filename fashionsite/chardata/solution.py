@@ -19,12 +19,16 @@ from fashionistapulp.modelresult import model_result_from_minimal, ModelResultMi
 import pickle
 from chardata.util import get_stats, get_scrolled_stats
 
-def get_solution(char):
+def get_minimal_solution(char):
     if char.minimal_solution:
-        minimal_solution = pickle.loads(char.minimal_solution)
-        if minimal_solution:
-            minimal_solution.update_base_stats(get_stats(char), get_scrolled_stats(char))
-            return model_result_from_minimal(minimal_solution)
+        return pickle.loads(char.minimal_solution)
+    return None
+
+def get_solution(char):
+    minimal_solution = get_minimal_solution(char)
+    if minimal_solution:
+        minimal_solution.update_base_stats(get_stats(char), get_scrolled_stats(char))
+        return model_result_from_minimal(minimal_solution)
     return None
 
 def set_solution(char, solution):